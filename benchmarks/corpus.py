@@ -0,0 +1,69 @@
+import random
+from typing import Callable, Dict, List
+
+"""
+Synthetic corpora and queries shared by the string_matcher benchmark and fuzzer.
+"""
+
+WORDS = [
+    'visual', 'studio', 'code', 'google', 'chrome', 'firefox', 'mozilla', 'media', 'player',
+    'notepad', 'settings', 'manager', 'system', 'control', 'panel', 'terminal', 'windows',
+    'explorer', 'python', 'steam', 'spotify', 'discord', 'office', 'word', 'excel', 'paint',
+]
+EXTENSIONS = ['exe', 'lnk', 'txt', 'py', 'json', 'png', 'dll']
+
+
+def app_names(rnd: random.Random, count: int) -> List[str]:
+    """Short application names, 'Visual Studio Code'"""
+    return [' '.join(rnd.choice(WORDS).capitalize() for _ in range(rnd.randint(1, 3))) for _ in range(count)]
+
+
+def paths(rnd: random.Random, count: int) -> List[str]:
+    """Long Windows paths"""
+    return [
+        'C:\\' + '\\'.join(rnd.choice(WORDS).capitalize() for _ in range(rnd.randint(2, 7))) + '.' + rnd.choice(EXTENSIONS)
+        for _ in range(count)
+    ]
+
+
+def camel_case(rnd: random.Random, count: int) -> List[str]:
+    """Identifiers, 'GetWindowTextLength'"""
+    return [''.join(rnd.choice(WORDS).capitalize() for _ in range(rnd.randint(2, 4))) for _ in range(count)]
+
+
+def with_digits(rnd: random.Random, count: int) -> List[str]:
+    """Versioned names, 'Python 3 11 64bit'"""
+    return [
+        f'{rnd.choice(WORDS).capitalize()} {rnd.randint(1, 30)} {rnd.randint(0, 99)}' + rnd.choice(['', ' 64bit', ' x86'])
+        for _ in range(count)
+    ]
+
+
+CORPORA: Dict[str, Callable[[random.Random, int], List[str]]] = {
+    'apps': app_names,
+    'paths': paths,
+    'camel': camel_case,
+    'digits': with_digits,
+}
+
+
+def prefix_query(rnd: random.Random, text: str) -> str:
+    word = rnd.choice(text.replace('\\', ' ').split() or [text])
+    return word[:rnd.randint(1, 4)].lower()
+
+
+def multi_word_query(rnd: random.Random, text: str) -> str:
+    words = text.replace('\\', ' ').split()
+    return ' '.join(word[:rnd.randint(1, 3)].lower() for word in rnd.sample(words, min(2, len(words))))
+
+
+def acronym_query(rnd: random.Random, text: str) -> str:
+    initials = ''.join(char for i, char in enumerate(text) if char.isupper() or i == 0 or text[i - 1] == ' ')
+    return initials.lower()[:rnd.randint(2, 4)] or text[:1]
+
+
+QUERIES: Dict[str, Callable[[random.Random, str], str]] = {
+    'prefix': prefix_query,
+    'multi_word': multi_word_query,
+    'acronym': acronym_query,
+}
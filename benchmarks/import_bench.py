@@ -0,0 +1,184 @@
+"""
+Cold start cost of a flox plugin process.
+
+Run from the repository root:
+
+    python -m benchmarks.import_bench --save-baseline
+    python -m benchmarks.import_bench --baseline benchmarks/import_baseline.json
+
+A throwaway launcher directory with a minimal plugin is created and a fresh
+interpreter is started for every run, the way the launcher starts a plugin
+for each query. The cumulative `-X importtime` of flox and the wall time of
+a whole query are reported as medians. With --baseline the exit code is 1
+when either is slower than the tolerance allows.
+
+The exit code is also 1 when importing flox loads any of DEFERRED_MODULES,
+which only the code paths needing them should import.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).with_name('import_baseline.json')
+DEFAULT_RUNS = 15
+DEFAULT_TOLERANCE = 0.25
+
+PLUGIN_SCRIPT = f'''
+import sys
+sys.path.insert(0, {str(ROOT)!r})
+from flox import Flox
+
+
+class Bench(Flox):
+
+    def query(self, query):
+        self.add_item(title=query)
+
+
+if __name__ == '__main__':
+    Bench().run()
+'''
+
+MANIFEST = {
+    'ID': 'flox-import-bench',
+    'ActionKeyword': 'bench',
+    'Name': 'Bench',
+    'Author': 'flox',
+    'Version': '1.0.0',
+    'Language': 'python',
+    'Website': 'https://github.com/Garulf/Flox',
+    'IcoPath': 'icon.png',
+    'ExecuteFileName': 'main.py',
+}
+
+# Imported on demand by flox, a plain query must not load them
+DEFERRED_MODULES = (
+    'asyncio',
+    'concurrent.futures',
+    'flox.browser',
+    'flox.string_matcher',
+    'hashlib',
+    'logging.handlers',
+    'queue',
+    'socket',
+    'sqlite3',
+    'tempfile',
+    'urllib.request',
+    'webbrowser',
+    'winreg',
+)
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def make_launcher(base: Path) -> Path:
+    """Create a FlowLauncher directory layout under base and return the plugin's entry script"""
+    user_dir = base / 'FlowLauncher' / 'UserData'
+    plugin_dir = user_dir / 'Plugins' / 'Bench'
+    (user_dir / 'Settings' / 'Plugins').mkdir(parents=True)
+    plugin_dir.mkdir(parents=True)
+    (user_dir / 'Settings' / 'Settings.json').write_text(json.dumps({'PluginSettings': {'Plugins': {}}}), encoding='utf-8')
+    (plugin_dir / 'plugin.json').write_text(json.dumps(MANIFEST), encoding='utf-8')
+    (plugin_dir / 'main.py').write_text(PLUGIN_SCRIPT, encoding='utf-8')
+    return plugin_dir / 'main.py'
+
+
+def plugin_env(base: Path) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+    env.setdefault('LOCALAPPDATA', str(base))
+    env.setdefault('APPDATA', str(base / 'Roaming'))
+    return env
+
+
+def import_time(script: Path, env: Dict[str, str]) -> Dict[str, int]:
+    """Cumulative import time in microseconds of flox and every module it imported, keyed by module"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import sys; sys.path.insert(0, {str(ROOT)!r}); import flox'],
+        cwd=str(script.parent), env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    rows = [match.groups() for match in map(IMPORTTIME_LINE.match, result.stderr.splitlines()) if match]
+    # Modules are listed after the modules they import, nested ones indented deeper than the top level
+    end = max(i for i, (_, _, indent, name) in enumerate(rows) if name == 'flox' and len(indent) == 1)
+    start = end
+    while start > 0 and len(rows[start - 1][2]) > 1:
+        start -= 1
+    return {name: int(cumulative) for _, cumulative, _, name in rows[start:end + 1]}
+
+
+def query_time(script: Path, env: Dict[str, str]) -> float:
+    request = json.dumps({'method': 'query', 'parameters': ['bench']})
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(script), request], cwd=str(script.parent), env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def run(runs: int) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as base:
+        base = Path(base)
+        script = make_launcher(base)
+        env = plugin_env(base)
+        # Warm the OS file cache and let flox save its environment state
+        query_time(script, env)
+        profiles = [import_time(script, env) for _ in range(runs)]
+        queries = [query_time(script, env) for _ in range(runs)]
+    imports = [profile['flox'] for profile in profiles]
+    results = {
+        'import_flox': {'ms': statistics.median(imports) / 1000},
+        'query': {'ms': statistics.median(queries) * 1000},
+    }
+    for key, result in results.items():
+        print(f'{key:<20} {result["ms"]:>8.2f} ms')
+    results['eager_imports'] = sorted(set(profiles[0]) & set(DEFERRED_MODULES))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return the measurements slower than baseline by more than tolerance"""
+    regressions = []
+    for key, result in results.items():
+        if key in baseline and isinstance(result, dict) and result['ms'] > baseline[key]['ms'] * (1 + tolerance):
+            regressions.append(f'{key}: {baseline[key]["ms"]:.2f} -> {result["ms"]:.2f} ms')
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--baseline', type=Path, help='compare against a stored run')
+    parser.add_argument('--save-baseline', nargs='?', type=Path, const=DEFAULT_BASELINE, help='store this run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed slowdown, 0.25 is 25%%')
+    args = parser.parse_args(argv)
+
+    results = run(args.runs)
+    failed = False
+    for module in results['eager_imports']:
+        print(f'EAGER IMPORT {module}')
+        failed = True
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=4, sort_keys=True), encoding='utf-8')
+        print(f'Saved baseline to {args.save_baseline}')
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Parity of the NumPy search backend with the pure Python search.
+
+Run from the repository root:
+
+    python -m benchmarks.numpy_parity --seed 1
+
+Every corpus kind is searched with every query kind, precision and k by
+CandidateIndex, which hands corpora of NUMPY_MIN_CORPUS_SIZE or more to
+flox.string_matcher_numpy, and by search() over a plain list, which never
+does. Both must return the same items, scores and highlight indices in the
+same order, the exit code is 1 when any case differs.
+"""
+
+import argparse
+import random
+import sys
+from typing import List
+
+from flox import string_matcher as sm
+
+from .corpus import CORPORA, QUERIES
+
+K_VALUES = [1, 10, 50, None]
+PRECISIONS = list(sm.QUERY_SEARCH_PRECISION.values())
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=sm.NUMPY_MIN_CORPUS_SIZE)
+    parser.add_argument('--queries', type=int, default=10, help='queries per corpus and query kind')
+    args = parser.parse_args(argv)
+
+    if sm.CandidateIndex(workers=1).numpy_corpus() is None:
+        print('NumPy is not installed, nothing to compare')
+        return 0
+    if args.size < sm.NUMPY_MIN_CORPUS_SIZE:
+        parser.error(f'--size must be at least NUMPY_MIN_CORPUS_SIZE ({sm.NUMPY_MIN_CORPUS_SIZE}) to use the NumPy backend')
+
+    rnd = random.Random(args.seed)
+    cases = failures = 0
+    for corpus_name, make_corpus in CORPORA.items():
+        texts = make_corpus(rnd, args.size)
+        index = sm.CandidateIndex(texts, workers=1)
+        for query_name, make_query in QUERIES.items():
+            for _ in range(args.queries):
+                query = make_query(rnd, rnd.choice(texts))
+                ignore_case = rnd.random() < 0.8
+                precision = rnd.choice(PRECISIONS)
+                k = rnd.choice(K_VALUES)
+                expected = sm.search(query, texts, k, ignore_case=ignore_case, query_search_precision=precision)
+                got = index.search(query, k, ignore_case, precision)
+                cases += 1
+                if got != expected:
+                    failures += 1
+                    print(f'{corpus_name}/{query_name} search({query!r}, k={k}, {ignore_case}, {precision}): {got[:3]} != {expected[:3]}')
+
+    print(f'{cases} cases, {failures} failures')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
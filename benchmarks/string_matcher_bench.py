@@ -0,0 +1,123 @@
+"""
+Latency and throughput of the string_matcher implementations.
+
+Run from the repository root:
+
+    python -m benchmarks.string_matcher_bench --save-baseline
+    python -m benchmarks.string_matcher_bench --baseline benchmarks/baseline.json
+
+Every corpus kind, size and query kind is timed against each implementation.
+With --baseline the per candidate latency is compared to a stored run and
+the exit code is 1 when any case is slower than the tolerance allows.
+Timings depend on the machine, so no baseline is committed: save one with
+--save-baseline before changing the matcher and compare against it after.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from flox import string_matcher as sm
+from flox.ngram_index import NgramIndex
+
+from .corpus import CORPORA, QUERIES
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+SIZES = [1000, 10000, 100000]
+QUICK_SIZES = [1000, 10000]
+QUERIES_PER_CASE = 5
+DEFAULT_TOLERANCE = 0.25
+
+
+def numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def implementations(texts: List[str]) -> Dict[str, Callable[[str], object]]:
+    """Callables searching texts for a query, built once per corpus"""
+    index = sm.CandidateIndex(texts, workers=1)
+    ngram = NgramIndex(texts)
+    impls = {
+        'reference': lambda query: [sm.string_matcher(query, text) for text in texts],
+        'compiled': index.match,
+        'search': lambda query: sm._select(sm.compile_query(query), zip(index.items, index.candidates), 50),
+        'ngram': lambda query: ngram.search(query, 50),
+    }
+    if numpy_available():
+        corpus = index.numpy_corpus()
+        impls['numpy'] = lambda query: corpus.search(sm.compile_query(query), 50)
+    return impls
+
+
+def run(sizes: List[int], seed: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for corpus_name, make_corpus in CORPORA.items():
+        for size in sizes:
+            rnd = random.Random(seed)
+            texts = make_corpus(rnd, size)
+            impls = implementations(texts)
+            for query_name, make_query in QUERIES.items():
+                queries = [make_query(rnd, rnd.choice(texts)) for _ in range(QUERIES_PER_CASE)]
+                for impl_name, impl in impls.items():
+                    impl(queries[0])
+                    start = time.perf_counter()
+                    for query in queries:
+                        impl(query)
+                    elapsed = (time.perf_counter() - start) / len(queries)
+                    key = f'{corpus_name}/{size}/{query_name}/{impl_name}'
+                    results[key] = {
+                        'per_call_us': elapsed / size * 1e6,
+                        'throughput': size / elapsed if elapsed else float('inf'),
+                    }
+                    print(f'{key:<40} {results[key]["per_call_us"]:>10.3f} us/candidate {results[key]["throughput"]:>14,.0f} candidates/s')
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return the cases slower than baseline by more than tolerance"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        previous = baseline[key]['per_call_us']
+        if result['per_call_us'] > previous * (1 + tolerance):
+            regressions.append(f'{key}: {previous:.3f} -> {result["per_call_us"]:.3f} us/candidate')
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='skip the largest corpora')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', type=Path, help='compare against a stored run')
+    parser.add_argument('--save-baseline', nargs='?', type=Path, const=DEFAULT_BASELINE, help='store this run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed slowdown, 0.25 is 25%%')
+    args = parser.parse_args(argv)
+    if args.baseline and not args.baseline.exists() and args.baseline != args.save_baseline:
+        parser.error(f'no baseline at {args.baseline}, store one on this machine first with --save-baseline {args.baseline}')
+
+    results = run(QUICK_SIZES if args.quick else SIZES, args.seed)
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=4, sort_keys=True), encoding='utf-8')
+        print(f'Saved baseline to {args.save_baseline}')
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Differential fuzzer for the string_matcher fast paths.
+
+Run from the repository root:
+
+    python -m benchmarks.string_matcher_fuzz --iterations 20000 --seed 1
+
+Random texts and queries, including CamelCase, digits, repeated spaces, lone
+surrogates and characters that change length when lowercased, are matched
+by the reference string_matcher and by every fast path: compiled queries,
+score-only matching, top-k search, the NumPy backend, the shared memory
+process pool, n-gram indexes (in memory and memory mapped), keystroke
+sessions and the match cache. Any difference is shrunk to a small
+reproduction and the exit code is 1.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from flox import string_matcher as sm
+from flox.mapped_index import MappedNgramIndex, write_index
+from flox.match_cache import MatchCache
+from flox.ngram_index import NgramIndex
+
+from .corpus import CORPORA, QUERIES
+
+# Lone surrogates stand in for undecodable Windows file names
+ALPHABET = 'aAbBcCdDeExXzZ 019-_.\\İß\udc80\ud800'
+PRECISIONS = list(sm.QUERY_SEARCH_PRECISION.values())
+K_VALUES = [1, 3, 10, None]
+
+
+def random_text(rnd: random.Random) -> str:
+    if rnd.random() < 0.5:
+        return rnd.choice(list(CORPORA.values()))(rnd, 1)[0]
+    return ''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 16)))
+
+
+def random_query(rnd: random.Random, text: str) -> str:
+    roll = rnd.random()
+    if roll < 0.5 and text.strip():
+        return rnd.choice(list(QUERIES.values()))(rnd, text)
+    if roll < 0.7 and text:
+        # An in order subsequence of text
+        return ''.join(char for char in text if rnd.random() < 0.3)
+    return ''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 4)))
+
+
+def reference_match(query: str, text: str, ignore_case: bool, precision: int) -> sm.MatchData:
+    try:
+        return sm.string_matcher(query, text, ignore_case, precision)
+    except IndexError:
+        # The reference walk can index past texts that change length when lowercased
+        return sm.MatchData(False, precision)
+
+
+def reference_search(query: str, texts: List[str], k: Optional[int], ignore_case: bool, precision: int) -> List[Tuple[int, sm.MatchData]]:
+    matches = [(i, reference_match(query, text, ignore_case, precision)) for i, text in enumerate(texts)]
+    matches = [(i, match) for i, match in matches if match.matched and match.score >= precision]
+    matches.sort(key=lambda entry: -entry[1].score)
+    return matches if k is None else matches[:k]
+
+
+def outcome(func: Callable, *args):
+    """Result of func, or IndexError when it raises one"""
+    try:
+        return func(*args)
+    except IndexError:
+        return IndexError
+
+
+def check_pair(query: str, text: str, ignore_case: bool, precision: int) -> Optional[str]:
+    """Return a description of the first fast path disagreeing with string_matcher"""
+    reference = outcome(sm.string_matcher, query, text, ignore_case, precision)
+    expected = reference
+    if reference is IndexError and ignore_case and len(text.lower()) != len(text):
+        expected = sm.MatchData(False, precision)
+    compiled = sm.compile_query(query, ignore_case, precision)
+    candidate = sm.Candidate(text)
+    match = outcome(compiled.match, candidate)
+    if match != expected:
+        return f'CompiledQuery.match: {match} != {expected}'
+    score = outcome(compiled.score, candidate)
+    if expected is IndexError:
+        if score is not IndexError:
+            return f'CompiledQuery.score: {score} != {expected}'
+    elif (score is None) == expected.matched or (score is not None and score != expected.score):
+        return f'CompiledQuery.score: {score} != {expected}'
+    elif expected.matched and compiled.max_score(candidate) < expected.score:
+        return f'CompiledQuery.max_score: {compiled.max_score(candidate)} < {expected.score}'
+    cache = MatchCache(4)
+    for _ in range(2):
+        cached = outcome(cache.match, query, text, ignore_case, precision)
+        if cached != reference:
+            return f'MatchCache.match: {cached} != {reference}'
+    return None
+
+
+def check_corpus(query: str, texts: List[str], k: Optional[int], ignore_case: bool, precision: int, workdir: Path) -> Optional[str]:
+    """Return a description of the first search backend disagreeing with the reference ranking"""
+    expected = reference_search(query, texts, k, ignore_case, precision)
+    positions = list(range(len(texts)))
+    results = {
+        'search': lambda: sm.search(query, positions, k, key=texts.__getitem__, ignore_case=ignore_case, query_search_precision=precision),
+        'CandidateIndex.search': lambda: sm.CandidateIndex(positions, key=texts.__getitem__, workers=1).search(query, k, ignore_case, precision),
+        'NgramIndex.search': lambda: NgramIndex(positions, key=texts.__getitem__).search(query, k, ignore_case, precision),
+    }
+
+    def numpy_search():
+        threshold = sm.NUMPY_MIN_CORPUS_SIZE
+        sm.NUMPY_MIN_CORPUS_SIZE = 0
+        try:
+            return sm.CandidateIndex(positions, key=texts.__getitem__, workers=1).search(query, k, ignore_case, precision)
+        finally:
+            sm.NUMPY_MIN_CORPUS_SIZE = threshold
+    if sm.CandidateIndex(workers=1).numpy_corpus() is not None:
+        results['NumpyCorpus.search'] = numpy_search
+
+    if texts:
+        def shared_corpus():
+            index = sm.CandidateIndex(positions, key=texts.__getitem__, workers=2, parallel_min_size=0)
+            try:
+                return index.search(query, k, ignore_case, precision)
+            finally:
+                index.close()
+        results['SharedCorpus.search'] = shared_corpus
+
+    def mapped():
+        path = workdir / 'fuzz.idx'
+        write_index(path, texts)
+        with MappedNgramIndex(path) as index:
+            return index.search(query, k, ignore_case, precision)
+    results['MappedNgramIndex.search'] = mapped
+
+    def session():
+        # Searched before the index is refilled with as many candidates, stale survivors would show
+        index = sm.CandidateIndex(positions[::-1], key=texts.__getitem__, workers=1)
+        matcher = sm.MatcherSession(index, ignore_case=ignore_case, query_search_precision=precision)
+        matcher.search(query[:1], k)
+        index.clear()
+        index.extend(positions)
+        for end in range(1, len(query)):
+            matcher.search(query[:end], k)
+        return matcher.search(query, k)
+    results['MatcherSession.search'] = session
+
+    for name, result in results.items():
+        got = result()
+        if got != expected:
+            return f'{name}: {got} != {expected}'
+    return None
+
+
+def shrink(failing: Callable[[str, str], bool], query: str, text: str) -> Tuple[str, str]:
+    """Greedily drop characters while the case keeps failing"""
+    changed = True
+    while changed:
+        changed = False
+        for which in ('query', 'text'):
+            value = query if which == 'query' else text
+            for i in range(len(value)):
+                smaller = value[:i] + value[i + 1:]
+                candidate = (smaller, text) if which == 'query' else (query, smaller)
+                if failing(*candidate):
+                    query, text = candidate
+                    changed = True
+                    break
+    return query, text
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus-size', type=int, default=40)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.seed)
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        for iteration in range(args.iterations):
+            ignore_case = rnd.random() < 0.8
+            precision = rnd.choice(PRECISIONS)
+            text = random_text(rnd)
+            query = random_query(rnd, text)
+            if check_pair(query, text, ignore_case, precision):
+                query, text = shrink(lambda q, t: check_pair(q, t, ignore_case, precision) is not None, query, text)
+                print(f'[{iteration}] string_matcher({query!r}, {text!r}, {ignore_case}, {precision}): {check_pair(query, text, ignore_case, precision)}')
+                failures += 1
+
+            if iteration % 10 == 0:
+                texts = [random_text(rnd) for _ in range(rnd.randint(0, args.corpus_size))]
+                query = random_query(rnd, rnd.choice(texts) if texts else '')
+                if '  ' in query.strip():
+                    # The reference walk raises on empty query substrings
+                    continue
+                k = rnd.choice(K_VALUES)
+                error = check_corpus(query, texts, k, ignore_case, precision, Path(workdir))
+                if error:
+                    print(f'[{iteration}] search({query!r}, {texts!r}, k={k}, {ignore_case}, {precision}): {error}')
+                    failures += 1
+
+    print(f'{args.iterations} iterations, {failures} failures')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
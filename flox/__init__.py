@@ -1,118 +1,155 @@
+import importlib
 import sys
-import traceback
 import os
 import json
 import time
-import webbrowser
-import urllib.parse
+from heapq import heapify, heappush, heapreplace
+from itertools import islice
 from datetime import date
 import logging
-import logging.handlers
 from pathlib import Path
-from typing import Union
+from typing import Any, Callable, Iterable, Union
 from functools import wraps, cached_property
-from tempfile import gettempdir
-
-from .launcher import Launcher
-from .browser import Browser
-from .settings import Settings
-
-PLUGIN_MANIFEST = 'plugin.json'
-FLOW_LAUNCHER_DIR_NAME = "FlowLauncher"
-SCOOP_FLOW_LAUNCHER_DIR_NAME = "flow-launcher"
-WOX_DIR_NAME = "Wox"
-FLOW_API = 'Flow.Launcher'
-WOX_API = 'Wox'
-APP_DIR = None
-USER_DIR = None
-LOCALAPPDATA = Path(os.getenv('LOCALAPPDATA'))
-APPDATA = Path(os.getenv('APPDATA'))
+
+from .launcher import DAEMON_ARG, Launcher, QueryCancelled
+from .result import Result
+from .side_store import SideStore
+from .settings import LauncherSettings, Settings
+from .providers import Provider, default_key, fan_out
+from .environment import (
+    FLOW_API, FLOW_LAUNCHER_DIR_NAME, PLUGIN_MANIFEST, SCOOP_FLOW_LAUNCHER_DIR_NAME, WOX_API, WOX_DIR_NAME,
+    current_working_dir, get_environment, launcher_not_found_msg,
+)
+
 FILE_PATH = os.path.dirname(os.path.abspath(__file__))
-CURRENT_WORKING_DIR = Path(sys.argv[0]).parent.resolve()
-LAUNCHER_NOT_FOUND_MSG = f"Unable to locate Launcher directory\nCurrent working directory: {CURRENT_WORKING_DIR}"
-
-
-launcher_dir = None
-path = CURRENT_WORKING_DIR
-if SCOOP_FLOW_LAUNCHER_DIR_NAME.lower() in str(path).lower():
-    launcher_name = SCOOP_FLOW_LAUNCHER_DIR_NAME
-    API = FLOW_API
-elif FLOW_LAUNCHER_DIR_NAME.lower() in str(path).lower():
-    launcher_name = FLOW_LAUNCHER_DIR_NAME
-    API = FLOW_API
-elif WOX_DIR_NAME.lower() in str(path).lower():
-    launcher_name = WOX_DIR_NAME
-    API = WOX_API
-else:
-    raise FileNotFoundError(LAUNCHER_NOT_FOUND_MSG)
-
-while True:
-    if len(path.parts) == 1:
-        raise FileNotFoundError(LAUNCHER_NOT_FOUND_MSG)
-    if path.joinpath('Settings').exists():
-        USER_DIR = path
-        if USER_DIR.name == 'UserData':
-            APP_DIR = USER_DIR.parent
-        elif str(CURRENT_WORKING_DIR).startswith(str(APPDATA)):
-            APP_DIR = LOCALAPPDATA.joinpath(launcher_name)
-        else:
-            raise FileNotFoundError(LAUNCHER_NOT_FOUND_MSG)
-        break
-
-    path = path.parent
-
-APP_ICONS = APP_DIR.joinpath("Images")
-ICON_APP = APP_DIR.joinpath('app.png')
-ICON_APP_ERROR = APP_DIR.joinpath(APP_ICONS, 'app_error.png')
-ICON_BROWSER = APP_DIR.joinpath(APP_ICONS, 'browser.png')
-ICON_CALCULATOR = APP_DIR.joinpath(APP_ICONS, 'calculator.png')
-ICON_CANCEL = APP_DIR.joinpath(APP_ICONS, 'cancel.png')
-ICON_CLOSE = APP_DIR.joinpath(APP_ICONS, 'close.png')
-ICON_CMD = APP_DIR.joinpath(APP_ICONS, 'cmd.png')
-ICON_COLOR = APP_DIR.joinpath('color.png')
-ICON_CONTROL_PANEL = APP_DIR.joinpath('ControlPanel.png')
-ICON_COPY = APP_DIR.joinpath('copy.png')
-ICON_DELETE_FILE_FOLDER = APP_DIR.joinpath('deletefilefolder.png')
-ICON_DISABLE = APP_DIR.joinpath('disable.png')
-ICON_DOWN = APP_DIR.joinpath('down.png')
-ICON_EXE = APP_DIR.joinpath('exe.png')
-ICON_FILE = APP_DIR.joinpath('file.png')
-ICON_FIND = APP_DIR.joinpath('find.png')
-ICON_FOLDER = APP_DIR.joinpath('folder.png')
-ICON_HISTORY = APP_DIR.joinpath('history.png')
-ICON_IMAGE = APP_DIR.joinpath('image.png')
-ICON_LOCK = APP_DIR.joinpath('lock.png')
-ICON_LOGOFF = APP_DIR.joinpath('logoff.png')
-ICON_OK = APP_DIR.joinpath('ok.png')
-ICON_OPEN = APP_DIR.joinpath('open.png')
-ICON_PICTURES = APP_DIR.joinpath('pictures.png')
-ICON_PLUGIN = APP_DIR.joinpath('plugin.png')
-ICON_PROGRAM = APP_DIR.joinpath('program.png')
-ICON_RECYCLEBIN = APP_DIR.joinpath('recyclebin.png')
-ICON_RESTART = APP_DIR.joinpath('restart.png')
-ICON_SEARCH = APP_DIR.joinpath('search.png')
-ICON_SETTINGS = APP_DIR.joinpath('settings.png')
-ICON_SHELL = APP_DIR.joinpath('shell.png')
-ICON_SHUTDOWN = APP_DIR.joinpath('shutdown.png')
-ICON_SLEEP = APP_DIR.joinpath('sleep.png')
-ICON_UP = APP_DIR.joinpath('up.png')
-ICON_UPDATE = APP_DIR.joinpath('update.png')
-ICON_URL = APP_DIR.joinpath('url.png')
-ICON_USER = APP_DIR.joinpath('user.png')
-ICON_WARNING = APP_DIR.joinpath('warning.png')
-ICON_WEB_SEARCH = APP_DIR.joinpath('web_search.png')
-ICON_WORK = APP_DIR.joinpath('work.png')
+
+# Icons shipped with the launcher, relative to APP_DIR
+ICONS = {
+    'APP_ICONS': ('Images',),
+    'ICON_APP': ('app.png',),
+    'ICON_APP_ERROR': ('Images', 'app_error.png'),
+    'ICON_BROWSER': ('Images', 'browser.png'),
+    'ICON_CALCULATOR': ('Images', 'calculator.png'),
+    'ICON_CANCEL': ('Images', 'cancel.png'),
+    'ICON_CLOSE': ('Images', 'close.png'),
+    'ICON_CMD': ('Images', 'cmd.png'),
+    'ICON_COLOR': ('color.png',),
+    'ICON_CONTROL_PANEL': ('ControlPanel.png',),
+    'ICON_COPY': ('copy.png',),
+    'ICON_DELETE_FILE_FOLDER': ('deletefilefolder.png',),
+    'ICON_DISABLE': ('disable.png',),
+    'ICON_DOWN': ('down.png',),
+    'ICON_EXE': ('exe.png',),
+    'ICON_FILE': ('file.png',),
+    'ICON_FIND': ('find.png',),
+    'ICON_FOLDER': ('folder.png',),
+    'ICON_HISTORY': ('history.png',),
+    'ICON_IMAGE': ('image.png',),
+    'ICON_LOCK': ('lock.png',),
+    'ICON_LOGOFF': ('logoff.png',),
+    'ICON_OK': ('ok.png',),
+    'ICON_OPEN': ('open.png',),
+    'ICON_PICTURES': ('pictures.png',),
+    'ICON_PLUGIN': ('plugin.png',),
+    'ICON_PROGRAM': ('program.png',),
+    'ICON_RECYCLEBIN': ('recyclebin.png',),
+    'ICON_RESTART': ('restart.png',),
+    'ICON_SEARCH': ('search.png',),
+    'ICON_SETTINGS': ('settings.png',),
+    'ICON_SHELL': ('shell.png',),
+    'ICON_SHUTDOWN': ('shutdown.png',),
+    'ICON_SLEEP': ('sleep.png',),
+    'ICON_UP': ('up.png',),
+    'ICON_UPDATE': ('update.png',),
+    'ICON_URL': ('url.png',),
+    'ICON_USER': ('user.png',),
+    'ICON_WARNING': ('warning.png',),
+    'ICON_WEB_SEARCH': ('web_search.png',),
+    'ICON_WORK': ('work.png',),
+}
+
+
+def _lazy(name):
+    """
+    Values that need the launcher directories, resolved on first use so
+    importing flox doesn't touch the filesystem
+    """
+    if name in ICONS:
+        value = get_environment().app_dir.joinpath(*ICONS[name])
+    elif name == 'APP_DIR':
+        value = get_environment().app_dir
+    elif name == 'USER_DIR':
+        value = get_environment().user_dir
+    elif name == 'API':
+        value = get_environment().api
+    elif name == 'launcher_name':
+        value = get_environment().launcher_name
+    elif name == 'LOCALAPPDATA':
+        value = Path(os.getenv('LOCALAPPDATA'))
+    elif name == 'APPDATA':
+        value = Path(os.getenv('APPDATA'))
+    elif name == 'CURRENT_WORKING_DIR':
+        value = current_working_dir()
+    elif name == 'LAUNCHER_NOT_FOUND_MSG':
+        value = launcher_not_found_msg()
+    elif name == 'path':
+        value = get_environment().user_dir
+    elif name == 'launcher_dir':
+        value = None
+    # Modules flox no longer imports up front, kept for star imports
+    elif name in ('traceback', 'webbrowser'):
+        value = importlib.import_module(name)
+    elif name == 'urllib':
+        import urllib.parse
+        value = urllib
+    elif name == 'gettempdir':
+        from tempfile import gettempdir as value
+    elif name == 'Browser':
+        from .browser import Browser as value
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __getattr__(name):
+    return _lazy(name)
+
+
+# Star imports resolve the lazy names through __getattr__, the modules and
+# helpers the module has always exported are kept for plugins relying on them
+__all__ = [
+    'Flox', 'Launcher', 'QueryCancelled', 'Result', 'Settings', 'LauncherSettings', 'Browser',
+    'sys', 'traceback', 'os', 'json', 'time', 'webbrowser', 'urllib', 'date', 'logging',
+    'Path', 'Union', 'wraps', 'cached_property', 'gettempdir', 'launcher_dir', 'path',
+    'PLUGIN_MANIFEST', 'FLOW_LAUNCHER_DIR_NAME', 'SCOOP_FLOW_LAUNCHER_DIR_NAME', 'WOX_DIR_NAME', 'FLOW_API', 'WOX_API', 'FILE_PATH',
+    'APP_DIR', 'USER_DIR', 'API', 'launcher_name', 'LOCALAPPDATA', 'APPDATA', 'CURRENT_WORKING_DIR', 'LAUNCHER_NOT_FOUND_MSG',
+    *ICONS,
+]
 
 
 class Flox(Launcher):
 
-    def __init_subclass__(cls, api=API, app_dir=APP_DIR, user_dir=USER_DIR):
+    # Keep only this many of the highest scored items added per request, None to keep all
+    max_results = None
+
+    # ContextData and action parameters whose JSON is longer than this are kept in side_store
+    # and sent to the launcher as a short token, None to always send them
+    side_store_threshold = None
+
+    # Shown when request_timeout passes before query returns, None to show nothing
+    loading_item_title = None
+    loading_item_subtitle = 'Some results are still loading, select to search again'
+
+    def __init_subclass__(cls, api=None, app_dir=None, user_dir=None):
         cls._debug = False
-        cls.appdir = APP_DIR
-        cls.user_dir = USER_DIR
-        cls.api = api
+        if app_dir is not None:
+            cls.appdir = app_dir
+        if user_dir is not None:
+            cls.user_dir = user_dir
+        if api is not None:
+            cls.api = api
         cls._start = time.time()
-        cls._results = []
         cls._settings = None
         cls.font_family = '/Resources/#Segoe Fluent Icons'
         cls.issue_item_title = 'Report Issue'
@@ -120,93 +157,247 @@ class Flox(Launcher):
 
     @cached_property
     def browser(self):
+        from .browser import Browser
         return Browser(self.app_settings)
 
     def exception(self, exception):
         self.exception_item(exception)
         self.issue_item(exception)
 
+    def on_request_timeout(self):
+        if self.loading_item_title and self.rpc_request.get('method') == 'query':
+            self.loading_item()
+
     def _query(self, query):
         self.args = query.lower()
+        if self._providers:
+            self.run_providers(query)
+        self._resolve(self.query(query))
 
-        self.query(query)
+    @cached_property
+    def _providers(self):
+        return {}
+
+    @cached_property
+    def _provider_pool(self):
+        # Daemon threads, a provider still running after request_timeout mustn't keep the process alive
+        from .threads import DaemonExecutor
+        return DaemonExecutor('flox-provider')
+
+    def add_provider(self, provider: Provider, name: str = None):
+        """
+        register a callable that takes the query and yields add_item keyword
+        dicts, every provider runs concurrently before query is called
+        """
+        self._providers[name or getattr(provider, '__name__', repr(provider))] = provider
+
+    def provider_key(self, item):
+        """
+        items from different providers with the same key are duplicates
+        """
+        return default_key(item)
+
+    def run_providers(self, query):
+        """
+        add the items of every provider as it finishes, keeping the best scored
+        item per provider_key. Providers still running deadline_margin before
+        request_timeout are skipped so the others make it into the results.
+        """
+        self.provider_timings = {}
+        added = {}
+        for name, items, seconds in fan_out(self._provider_pool, self._providers, query, self._budget(self.deadline_margin)):
+            self.provider_timings[name] = seconds
+            self.logger.debug(f'Provider {name}: {int(seconds * 1000)}ms')
+            for item in sorted(items, key=lambda item: item.get('score', 0), reverse=True):
+                key = self.provider_key(item)
+                previous = added.get(key)
+                if previous is not None:
+                    if item.get('score', 0) <= previous.score:
+                        continue
+                    self._discard(previous)
+                added[key] = self.add_item(**item)
 
     def _context_menu(self, data):
-        self.context_menu(data)
+        self._resolve(self.context_menu(data))
 
     def exception_item(self, exception):
-        self.add_item(
+        self._pin_item(
             title=exception.__class__.__name__,
             subtitle=str(exception),
-            icon=ICON_APP_ERROR,
+            icon=_lazy('ICON_APP_ERROR'),
             method=self.change_query,
             dont_hide=True
         )
 
     def issue_item(self, e):
+        import traceback
         trace = ''.join(traceback.format_exception(type(e), value=e, tb=e.__traceback__)).replace('\n', '%0A')
-        self.add_item(
+        self._pin_item(
             title=self.issue_item_title,
             subtitle=self.issue_item_subtitle,
-            icon=ICON_BROWSER,
+            icon=_lazy('ICON_BROWSER'),
             method=self.create_github_issue,
             parameters=[e.__class__.__name__, trace],
         )
 
+    def loading_item(self):
+        query = f"{self.user_keyword} {self.rpc_request['parameters'][0]}".replace('* ', '')
+        self._pin_item(
+            title=self.loading_item_title,
+            subtitle=self.loading_item_subtitle,
+            icon=_lazy('ICON_HISTORY'),
+            method=self.change_query,
+            parameters=[query, True],
+            dont_hide=True
+        )
+
     def create_github_issue(self, title, trace, log=None):
         url = self.manifest['Website']
         if 'github' in url.lower():
             issue_body = f"Please+type+any+relevant+information+here%0A%0A%0A%0A%0A%0A%3Cdetails open%3E%3Csummary%3ETrace+Log%3C%2Fsummary%3E%0A%3Cp%3E%0A%0A%60%60%60%0A{trace}%0A%60%60%60%0A%3C%2Fp%3E%0A%3C%2Fdetails%3E"
             url = f"{url}/issues/new?title={title}&body={issue_body}"
+        import webbrowser
         webbrowser.open(url)
 
     def add_item(self, title:str, subtitle:str='', icon:str=None, method:Union[str, callable]=None, parameters:list=None, context:list=None, glyph:str=None, score:int=0, **kwargs):
+        item = self._item(title, subtitle, icon, method, parameters, context, glyph, score, **kwargs)
+        results = self._results
+        with results.lock:
+            if self.max_results is not None:
+                return self._keep_top(item)
+            results.append(item)
+        return item
+
+    def _pin_item(self, **kwargs):
+        """
+        add_item for error and loading items, max_results never drops them
+        """
+        item = self._item(**kwargs)
+        results = self._results
+        with results.lock:
+            results.append(item)
+        return item
+
+    def _item(self, title:str, subtitle:str='', icon:str=None, method:Union[str, callable]=None, parameters:list=None, context:list=None, glyph:str=None, score:int=0, **kwargs):
         icon = icon or self.icon
         if not Path(icon).is_absolute():
             icon = Path(self.plugindir, icon)
-        item = {
-            "Title": str(title),
-            "SubTitle": str(subtitle),
-            "IcoPath": str(icon),
-            "ContextData": context,
-            "Score": score,
-            "JsonRPCAction": {}
-        }
         auto_complete_text = kwargs.pop("auto_complete_text", None)
-
-        item["AutoCompleteText"] = auto_complete_text or f'{self.user_keyword} {title}'.replace('* ', '')
+        item = Result(
+            str(title),
+            str(subtitle),
+            str(icon),
+            context,
+            score,
+            auto_complete_text or f'{self.user_keyword} {title}'.replace('* ', '')
+        )
         if method:
-            item['JsonRPCAction']['method'] = getattr(method, "__name__", method)
-            item['JsonRPCAction']['parameters'] = parameters or []
-            item['JsonRPCAction']['dontHideAfterAction'] = kwargs.pop("dont_hide", False)
+            item.method = getattr(method, "__name__", method)
+            item.parameters = parameters or []
+            item.dont_hide = kwargs.pop("dont_hide", False)
         if glyph:
-            item['Glyph'] = {}
-            item['Glyph']['Glyph'] = glyph
+            item.glyph = glyph
             font_family =  kwargs.pop("font_family", self.font_family)
             if font_family.startswith("#"):
                 font_family = str(Path(self.plugindir).joinpath(font_family))
-            item['Glyph']['FontFamily'] = font_family
+            item.font_family = font_family
         for kw in kwargs:
             item[kw] = kwargs[kw]
-        self._results.append(item)
-        return self._results[-1]
+        return item
+
+    def add_items(self, records: Iterable, key: Callable[[Any], str], formatter: Callable[[Any], dict], query: str = None, limit: int = None):
+        """
+        fuzzy match key(record) against query and add_item only the best
+        limit records, formatter(record) returns the add_item keyword dict
+        and is never called for records that are filtered out. The match
+        score is used unless the formatter sets one.
+
+        query defaults to the current query and limit to max_results, an
+        empty query adds the first limit records in order.
+        """
+        from .string_matcher import QUERY_SEARCH_PRECISION, DEFAULT_QUERY_SEARCH_PRECISION, search
+        if query is None:
+            query = self.rpc_request['parameters'][0] if self.rpc_request.get('method') == 'query' else ''
+        limit = self.max_results if limit is None else limit
+        query = ' '.join(query.split())
+        if not query:
+            matches = ((record, 0) for record in islice(records, limit))
+        else:
+            precision = QUERY_SEARCH_PRECISION.get(self.query_search_precision, DEFAULT_QUERY_SEARCH_PRECISION)
+            matches = ((record, match.score) for record, match in search(query, records, limit, key=key, query_search_precision=precision))
+        items = []
+        for record, score in matches:
+            kwargs = formatter(record)
+            kwargs.setdefault('score', int(score))
+            items.append(self.add_item(**kwargs))
+        return items
 
     @cached_property
-    def plugindir(self):
-        potential_paths = [
-            os.path.abspath(os.getcwd()),
-            os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
-        ]
-
-        for path in potential_paths:
-
-            while True:
-                if os.path.exists(os.path.join(path, PLUGIN_MANIFEST)):
-                    return path
-                elif os.path.ismount(path):
-                    return os.getcwd()
+    def side_store(self):
+        if self.side_store_threshold is None:
+            return None
+        if len(sys.argv) > 1 and sys.argv[1] == DAEMON_ARG:
+            return SideStore()
+        from tempfile import gettempdir
+        return SideStore(os.path.join(gettempdir(), 'flox-side-store', self.id))
+
+    def _serialize(self, result):
+        item = super()._serialize(result)
+        if self.side_store is None or not isinstance(result, Result):
+            return item
+        # Only the items actually returned are stashed, not those max_results dropped
+        if item.get('ContextData') is not None:
+            item['ContextData'] = self._stash(item['ContextData'])
+        action = item.get('JsonRPCAction')
+        if action and action.get('parameters'):
+            item['JsonRPCAction'] = dict(action, parameters=[self._stash(parameter) for parameter in action['parameters']])
+        return item
+
+    def _stash(self, value):
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        data = value if isinstance(value, str) else self._response_encoder.dumps(value)
+        if len(data) <= self.side_store_threshold:
+            return value
+        return self.side_store.put(value, None if isinstance(value, str) else data)
+
+    def _discard(self, item):
+        """
+        remove an item added during this request
+        """
+        results = self._results
+        with results.lock:
+            for i, result in enumerate(results):
+                if result is item:
+                    del results[i]
+                    break
+            if any(entry[2] is item for entry in results.top):
+                results.top = [entry for entry in results.top if entry[2] is not item]
+                heapify(results.top)
+
+    def _keep_top(self, item):
+        """
+        add item if it is among the max_results highest scores so far, earlier items win ties,
+        called holding the results lock
+        """
+        results = self._results
+        results.added += 1
+        entry = (item.score, -results.added, item)
+        if len(results.top) < self.max_results:
+            heappush(results.top, entry)
+            results.append(item)
+        elif results.top and entry[:2] > results.top[0][:2]:
+            evicted = heapreplace(results.top, entry)[2]
+            for i, result in enumerate(results):
+                if result is evicted:
+                    del results[i]
+                    break
+            results.append(item)
+        return item
 
-                path = os.path.dirname(path)
+    @cached_property
+    def plugindir(self):
+        return get_environment().plugindir
 
     @cached_property
     def manifest(self):
@@ -234,18 +425,21 @@ class Flox(Launcher):
         # Userdata should be up two directories from plugin root
         return os.path.dirname(os.path.dirname(self.plugindir))
 
+    @cached_property
+    def launcher_settings(self):
+        return LauncherSettings(os.path.join(self.appdata, 'Settings', 'Settings.json'))
+
     @property
     def app_settings(self):
-        with open(os.path.join(self.appdata, 'Settings', 'Settings.json'), 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return self.launcher_settings.data
 
     @property
     def query_search_precision(self):
-        return self.app_settings.get('QuerySearchPrecision', 'Regular')
+        return self.launcher_settings.get('QuerySearchPrecision', default='Regular')
 
     @cached_property
     def user_keywords(self):
-        return self.app_settings['PluginSettings']['Plugins'].get(self.id, {}).get('UserKeywords', [self.action_keyword])
+        return self.launcher_settings.get('PluginSettings', 'Plugins', self.id, 'UserKeywords', default=[self.action_keyword])
 
     @cached_property
     def user_keyword(self):
@@ -277,7 +471,8 @@ class Flox(Launcher):
         formatter = logging.Formatter(
             '%(asctime)s %(levelname)s (%(filename)s): %(message)s',
             datefmt='%H:%M:%S')
-        logfile = logging.handlers.RotatingFileHandler(
+        from logging.handlers import RotatingFileHandler
+        logfile = RotatingFileHandler(
                 self.logfile,
                 maxBytes=1024 * 2024,
                 backupCount=1)
@@ -300,11 +495,15 @@ class Flox(Launcher):
 
     @cached_property
     def api(self):
-        launcher = os.path.basename(os.path.dirname(self.appdir))
-        if launcher == 'FlowLauncher':
-            return FLOW_API
-        else:
-            return WOX_API
+        return get_environment().api
+
+    @cached_property
+    def appdir(self):
+        return get_environment().app_dir
+
+    @cached_property
+    def user_dir(self):
+        return get_environment().user_dir
 
     @cached_property
     def name(self):
@@ -328,12 +527,19 @@ class Flox(Launcher):
             os.mkdir(os.path.dirname(self.settings_path))
         return Settings(self.settings_path)
 
+    @cached_property
+    def store(self):
+        """SQLite key -> value tables kept next to the plugin's settings"""
+        from .store import Store
+        os.makedirs(os.path.dirname(self.settings_path), exist_ok=True)
+        return Store(os.path.join(os.path.dirname(self.settings_path), 'Store.sqlite3'))
+
     def browser_open(self, url):
         self.browser.open(url)
 
     @cached_property
     def python_dir(self):
-        return self.app_settings["PluginSettings"]["PythonDirectory"]
+        return self.launcher_settings.get("PluginSettings", "PythonDirectory")
 
     def log(self):
         return self.logger
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Drive a plugin in daemon mode the way the launcher would.
+
+    python -m flox.emulator path/to/main.py "fire" "firefox"
+    python -m flox.emulator path/to/main.py < queries.txt
+
+Each argument (or stdin line) is sent as a query request, a line starting
+with "{" is sent as a raw JSON-RPC request. Results and the round trip time
+of every request are printed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List
+
+from .launcher import DAEMON_ARG
+
+
+class Emulator(object):
+    """Talks newline delimited JSON-RPC to a plugin started with DAEMON_ARG"""
+
+    def __init__(self, plugin: str, python: str = sys.executable):
+        plugin = Path(plugin).resolve()
+        env = dict(os.environ, PYTHONIOENCODING='utf-8', PYTHONUNBUFFERED='1')
+        self.process = subprocess.Popen(
+            [python, str(plugin), DAEMON_ARG],
+            cwd=str(plugin.parent),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            encoding='utf-8',
+        )
+        self._id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def request(self, method: str, parameters: list = None, **extra) -> dict:
+        """Send a request and return its response, launcher API calls made on the way are under "calls" """
+        self._id += 1
+        rpc_request = dict(extra, method=method, parameters=parameters or [], id=self._id)
+        self.process.stdin.write(json.dumps(rpc_request) + '\n')
+        self.process.stdin.flush()
+        calls = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise EOFError(f'Plugin exited with code {self.process.wait()}')
+            message = json.loads(line)
+            if message.get('id') == self._id and ('result' in message or 'error' in message):
+                message['calls'] = calls
+                return message
+            calls.append(message)
+
+    def query(self, query: str) -> dict:
+        return self.request('query', [query])
+
+    def context_menu(self, data) -> dict:
+        return self.request('context_menu', [data])
+
+
+def requests_from(lines: Iterable[str]):
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith('{'):
+            rpc_request = json.loads(line)
+            yield rpc_request.pop('method'), rpc_request.pop('parameters', []), rpc_request
+        else:
+            yield 'query', [line], {}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('plugin', help="the plugin's entry script")
+    parser.add_argument('queries', nargs='*', help='queries to send, read from stdin when omitted')
+    parser.add_argument('--python', default=sys.executable, help='interpreter to run the plugin with')
+    args = parser.parse_args(argv)
+
+    with Emulator(args.plugin, args.python) as emulator:
+        for method, parameters, extra in requests_from(args.queries or sys.stdin):
+            start = time.perf_counter()
+            response = emulator.request(method, parameters, **extra)
+            ms = (time.perf_counter() - start) * 1000
+            print(f'{method} {parameters!r}: {ms:.1f}ms')
+            for call in response['calls']:
+                print(f'  call {call.get("method")} {call.get("parameters")}')
+            if 'error' in response:
+                print(f'  error {response["error"]}')
+            for item in response.get('result') or []:
+                print(f'  {item.get("Score", 0):>5} {item.get("Title")} | {item.get("SubTitle")}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+JSON encoders for launcher responses.
+
+orjson and ujson are used when installed, falling back to the standard
+library. Encoders write bytes straight to a binary stream such as
+sys.stdout.buffer, skipping print() and the text layer.
+"""
+import json
+from importlib import import_module
+from typing import Any, BinaryIO
+
+# Tried in this order when no encoder is named
+PREFERRED = ('orjson', 'ujson', 'json')
+
+
+class JsonEncoder(object):
+    name = 'json'
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def write(self, obj: Any, stream: BinaryIO) -> None:
+        # One dumps call beats json.dump, whose chunked encoding runs in pure Python
+        stream.write(json.dumps(obj).encode('utf-8'))
+
+
+class OrjsonEncoder(JsonEncoder):
+    name = 'orjson'
+
+    def __init__(self):
+        self._orjson = import_module('orjson')
+
+    def dumps(self, obj: Any) -> str:
+        try:
+            return self._orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj)
+
+    def write(self, obj: Any, stream: BinaryIO) -> None:
+        try:
+            data = self._orjson.dumps(obj)
+        except TypeError:
+            # Non str dict keys and the like, which the standard library accepts
+            return super().write(obj, stream)
+        stream.write(data)
+
+
+class UjsonEncoder(JsonEncoder):
+    name = 'ujson'
+
+    def __init__(self):
+        self._ujson = import_module('ujson')
+
+    def dumps(self, obj: Any) -> str:
+        return self._ujson.dumps(obj)
+
+    def write(self, obj: Any, stream: BinaryIO) -> None:
+        stream.write(self._ujson.dumps(obj).encode('utf-8'))
+
+
+ENCODERS = {encoder.name: encoder for encoder in (OrjsonEncoder, UjsonEncoder, JsonEncoder)}
+
+
+def get_encoder(name: str = None) -> JsonEncoder:
+    """The named encoder, or the first one in PREFERRED that is installed"""
+    if name is not None:
+        return ENCODERS[name]()
+    for name in PREFERRED:
+        try:
+            return ENCODERS[name]()
+        except ImportError:
+            continue
+    return JsonEncoder()
@@ -0,0 +1,157 @@
+"""
+Locate the launcher and plugin directories.
+
+Resolving them walks up the directory tree, so the result is saved to a
+small state file next to the plugin script and reused by later processes
+for as long as the paths it was derived from keep their mtimes.
+"""
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+log = logging.getLogger(__name__)
+
+PLUGIN_MANIFEST = 'plugin.json'
+FLOW_LAUNCHER_DIR_NAME = "FlowLauncher"
+SCOOP_FLOW_LAUNCHER_DIR_NAME = "flow-launcher"
+WOX_DIR_NAME = "Wox"
+FLOW_API = 'Flow.Launcher'
+WOX_API = 'Wox'
+STATE_FILE = '.flox-environment.json'
+STATE_VERSION = 1
+
+
+class Environment(NamedTuple):
+    app_dir: Path
+    user_dir: Path
+    api: str
+    launcher_name: str
+    plugindir: str
+
+
+_environment: Optional[Environment] = None
+
+
+def current_working_dir() -> Path:
+    return Path(sys.argv[0]).parent.resolve()
+
+
+def launcher_not_found_msg() -> str:
+    return f"Unable to locate Launcher directory\nCurrent working directory: {current_working_dir()}"
+
+
+def find_launcher(path: Path):
+    """Return (app_dir, user_dir, api, launcher_name) for a plugin under path"""
+    if SCOOP_FLOW_LAUNCHER_DIR_NAME.lower() in str(path).lower():
+        launcher_name = SCOOP_FLOW_LAUNCHER_DIR_NAME
+        api = FLOW_API
+    elif FLOW_LAUNCHER_DIR_NAME.lower() in str(path).lower():
+        launcher_name = FLOW_LAUNCHER_DIR_NAME
+        api = FLOW_API
+    elif WOX_DIR_NAME.lower() in str(path).lower():
+        launcher_name = WOX_DIR_NAME
+        api = WOX_API
+    else:
+        raise FileNotFoundError(launcher_not_found_msg())
+
+    start = path
+    while True:
+        if len(path.parts) == 1:
+            raise FileNotFoundError(launcher_not_found_msg())
+        if path.joinpath('Settings').exists():
+            user_dir = path
+            if user_dir.name == 'UserData':
+                app_dir = user_dir.parent
+            elif str(start).startswith(str(Path(os.getenv('APPDATA')))):
+                app_dir = Path(os.getenv('LOCALAPPDATA')).joinpath(launcher_name)
+            else:
+                raise FileNotFoundError(launcher_not_found_msg())
+            return app_dir, user_dir, api, launcher_name
+
+        path = path.parent
+
+
+def find_plugindir() -> str:
+    """Closest directory holding plugin.json, above the working directory or the flox package"""
+    potential_paths = [
+        os.path.abspath(os.getcwd()),
+        os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+    ]
+
+    for path in potential_paths:
+
+        while True:
+            if os.path.exists(os.path.join(path, PLUGIN_MANIFEST)):
+                return path
+            elif os.path.ismount(path):
+                return os.getcwd()
+
+            path = os.path.dirname(path)
+
+
+def _mtimes(environment: Environment) -> Dict[str, int]:
+    # Not the plugin directory itself, writing the state file changes its mtime
+    manifest = Path(environment.plugindir, PLUGIN_MANIFEST)
+    paths = [environment.user_dir, manifest if manifest.exists() else Path(environment.plugindir)]
+    return {str(path): path.stat().st_mtime_ns for path in paths}
+
+
+def _load_state(state_file: Path, script_dir: Path, cwd: str) -> Optional[Environment]:
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state['version'] != STATE_VERSION or state['script_dir'] != str(script_dir) or state['cwd'] != cwd:
+            return None
+        environment = Environment(Path(state['app_dir']), Path(state['user_dir']), state['api'], state['launcher_name'], state['plugindir'])
+        if _mtimes(environment) != state['mtimes']:
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return environment
+
+
+def _save_state(state_file: Path, script_dir: Path, cwd: str, environment: Environment) -> None:
+    try:
+        mtimes = _mtimes(environment)
+    except OSError:
+        return
+    state = {
+        'version': STATE_VERSION,
+        'script_dir': str(script_dir),
+        'cwd': cwd,
+        'app_dir': str(environment.app_dir),
+        'user_dir': str(environment.user_dir),
+        'api': environment.api,
+        'launcher_name': environment.launcher_name,
+        'plugindir': environment.plugindir,
+        'mtimes': mtimes,
+    }
+    tmp_file = state_file.with_name(f'{state_file.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, state_file)
+    except OSError:
+        log.debug('Unable to save %s', state_file)
+
+
+def get_environment() -> Environment:
+    """
+    The launcher and plugin directories for this process, read from the
+    state file when it is still valid and discovered otherwise.
+
+    Raises FileNotFoundError when the plugin isn't inside a launcher's directory.
+    """
+    global _environment
+    if _environment is None:
+        script_dir = current_working_dir()
+        cwd = os.path.abspath(os.getcwd())
+        state_file = script_dir.joinpath(STATE_FILE)
+        _environment = _load_state(state_file, script_dir, cwd)
+        if _environment is None:
+            _environment = Environment(*find_launcher(script_dir), find_plugindir())
+            _save_state(state_file, script_dir, cwd, _environment)
+    return _environment
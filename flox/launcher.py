@@ -1,25 +1,313 @@
 # -*- coding: utf-8 -*-
 import json
 import sys
+import threading
+from collections import deque
+from collections.abc import Awaitable
+from contextlib import nullcontext
+from functools import partial
 from time import time
 
+from .encoder import get_encoder
+from .result import Result, ResultBuffer
+from .settings import Settings
+
 """
 Slightly modified wox.py credit: https://github.com/Wox-launcher/Wox
 """
 
+# Passed as the only argument to start a plugin as a long lived process, see Launcher.run_daemon
+DAEMON_ARG = '--daemon'
+
+
+class QueryCancelled(Exception):
+    """
+    Raised by Launcher.check_cancelled when a newer query has superseded the current one
+    """
+
+
+def is_query(rpc_request):
+    return isinstance(rpc_request, dict) and rpc_request.get('method') == 'query'
+
 class Launcher(object):
     """
     Launcher python plugin base
     """
 
+    # 'orjson', 'ujson' or 'json', None uses the fastest one installed
+    json_encoder = None
+
+    # Leave fields holding their default value (ContextData, JsonRPCAction, Score) out of results
+    compact_results = False
+
+    # SideStore that ContextData and action parameters sent as tokens are looked up in
+    side_store = None
+
+    # Seconds a query or context_menu request may run before the results so far are returned, None for no limit
+    request_timeout = None
+
+    # Seconds before request_timeout at which gather stops waiting, leaving time to add what finished
+    deadline_margin = 0.05
+
     def run(self, debug=None):
         if debug:
             self._debug = debug
-        self.rpc_request = {'method': 'query', 'parameters': ['']}
+        if len(sys.argv) > 1 and sys.argv[1] == DAEMON_ARG:
+            return self.run_daemon()
+        rpc_request = {'method': 'query', 'parameters': ['']}
         if len(sys.argv) > 1:
-            self.rpc_request = json.loads(sys.argv[1])
+            rpc_request = json.loads(sys.argv[1])
+        response = self.handle_request(rpc_request)
+        if response is not None:
+            self._write(response)
+
+    def run_daemon(self):
+        """
+        Serve newline delimited JSON-RPC requests from stdin until it is closed.
+
+        Every request gets exactly one response line, echoing the request "id"
+        when there is one. Launcher API calls made while handling a request
+        (change_query, show_msg...) are written before its response.
+
+        A query that has been superseded by a newer queued query is answered
+        with an empty cancelled result without running it. A newer query
+        arriving while one is running sets `request_cancelled`, handlers can
+        check it or call check_cancelled() to stop early.
+        """
+        import queue
+        self._requests = queue.Queue()
+        self._cancel = threading.Event()
+        self._query_in_flight = False
+        threading.Thread(target=self._read_requests, daemon=True).start()
+        pending = deque()
+        while True:
+            if not pending:
+                pending.append(self._requests.get())
+            while True:
+                try:
+                    pending.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            rpc_request = pending.popleft()
+            if rpc_request is None:
+                break
+            if is_query(rpc_request) and any(is_query(queued) for queued in pending):
+                self.logger.debug(f'Skipping superseded request: {rpc_request}')
+                self._respond(rpc_request, {"result": [], "cancelled": True})
+                continue
+            self._cancel.clear()
+            self._query_in_flight = is_query(rpc_request)
+            try:
+                if isinstance(rpc_request, Exception):
+                    raise rpc_request
+                response = self.handle_request(rpc_request) or {"result": None}
+            except QueryCancelled:
+                self.logger.debug(f'Cancelled request: {rpc_request}')
+                response = {"result": [], "cancelled": True}
+            except Exception as e:
+                self.logger.exception(e)
+                response = {"error": {"type": e.__class__.__name__, "message": str(e)}}
+            finally:
+                self._query_in_flight = False
+            self._respond(rpc_request, response)
+
+    def _read_requests(self):
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rpc_request = json.loads(line)
+            except ValueError as e:
+                rpc_request = e
+            if self._query_in_flight and is_query(rpc_request):
+                self._cancel.set()
+            self._requests.put(rpc_request)
+        self._requests.put(None)
+
+    def _respond(self, rpc_request, response):
+        if isinstance(rpc_request, dict) and 'id' in rpc_request:
+            response['id'] = rpc_request['id']
+        self._write(response)
+
+    @property
+    def _response_encoder(self):
+        encoder = getattr(self, '_encoder', None)
+        if encoder is None:
+            encoder = self._encoder = get_encoder(self.json_encoder)
+        return encoder
+
+    def _write(self, response):
+        """
+        write a response line to stdout, encoding straight into its buffer
+        """
+        stream = getattr(sys.stdout, 'buffer', None)
+        if stream is None or (sys.stdout.encoding or '').lower().replace('-', '') != 'utf8':
+            # Only the standard library escapes non ascii text for other stdout encodings
+            print(json.dumps(response))
+            sys.stdout.flush()
+            return
+        # Launcher API calls printed earlier must come first
+        sys.stdout.flush()
+        self._response_encoder.write(response, stream)
+        stream.write(b'\n')
+        stream.flush()
+
+    @property
+    def request_cancelled(self):
+        """
+        True once a newer query has arrived for the query being handled, or
+        its results have already been returned because request_timeout passed
+        """
+        expired = getattr(self._request_state, 'expired', None) or getattr(self, '_expired', None)
+        return any(event is not None and event.is_set() for event in (getattr(self, '_cancel', None), expired))
+
+    def check_cancelled(self):
+        """
+        raise QueryCancelled if a newer query has arrived or the request has timed out
+        """
+        if self.request_cancelled:
+            raise QueryCancelled()
+
+    @property
+    def event_loop(self):
+        """
+        event loop async handlers run on, kept between requests in daemon mode
+        """
+        import asyncio
+        loop = getattr(self, '_loop', None)
+        if loop is None or loop.is_closed():
+            loop = self._loop = asyncio.new_event_loop()
+        return loop
+
+    @property
+    def request_remaining(self):
+        """
+        seconds left before request_timeout, inf when there is no limit
+        """
+        if self.request_timeout is None:
+            return float('inf')
+        return max(self._start + self.request_timeout - time(), 0)
+
+    def _budget(self, margin=0):
+        return None if self.request_timeout is None else max(self.request_remaining - margin, 0)
+
+    @property
+    def _thread_pool(self):
+        """
+        executor to_thread runs blocking calls on, its daemon threads don't keep the process alive
+        """
+        executor = getattr(self, '_thread_executor', None)
+        if executor is None:
+            from .threads import DaemonExecutor
+            executor = self._thread_executor = DaemonExecutor('flox-thread')
+        return executor
+
+    def _resolve(self, result):
+        """
+        run result to completion if a handler returned a coroutine
+        """
+        if not isinstance(result, Awaitable):
+            return result
+        import asyncio
+        loop = self.event_loop
+        if loop.is_running():
+            # Still running a handler that timed out in an earlier request
+            loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(asyncio.wait_for(result, self._budget()))
+        except asyncio.TimeoutError:
+            self.logger.warning(f'Request ran past its {self.request_timeout}s budget, returning the results so far')
+            return None
+        finally:
+            if loop is not self._loop:
+                loop.close()
+
+    async def gather(self, *aws, timeout=None):
+        """
+        await aws concurrently and return their results in order.
+
+        An awaitable that raises, or is still running after timeout seconds
+        or deadline_margin before the request budget runs out, gives None so
+        the other sources still make it into the results.
+        """
+        import asyncio
+        tasks = [asyncio.ensure_future(aw) for aw in aws]
+        if not tasks:
+            return []
+        budget = self._budget(self.deadline_margin)
+        if timeout is None or (budget is not None and budget < timeout):
+            timeout = budget
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            self.logger.warning(f'Cancelled {task} after {timeout}s')
+            task.cancel()
+        results = []
+        for task in tasks:
+            if task in pending or task.cancelled():
+                results.append(None)
+            elif task.exception() is None:
+                results.append(task.result())
+            elif isinstance(task.exception(), QueryCancelled):
+                raise task.exception()
+            else:
+                self.logger.exception(task.exception(), exc_info=task.exception())
+                results.append(None)
+        return results
+
+    async def to_thread(self, func, *args, **kwargs):
+        """
+        run a blocking function in a worker thread without holding up the event loop
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self._thread_pool, partial(func, *args, **kwargs))
+
+    @property
+    def _request_state(self):
+        """
+        per thread state, the worker threads of _dispatch_until_timeout keep
+        their own request's results and expired event there
+        """
+        state = self.__dict__.get('_thread_state')
+        if state is None:
+            state = self.__dict__['_thread_state'] = threading.local()
+        return state
+
+    @property
+    def _results(self):
+        """
+        items added during the current request, a new list per instance and per request.
+        A handler still running after its request timed out keeps adding to its own list.
+        """
+        results = getattr(self._request_state, 'results', None)
+        if results is not None:
+            return results
+        results = self.__dict__.get('_result_buffer')
+        if results is None:
+            results = self.__dict__['_result_buffer'] = ResultBuffer()
+        return results
+
+    @_results.setter
+    def _results(self, results):
+        state = self._request_state
+        if getattr(state, 'results', None) is not None:
+            state.results = results
+        else:
+            self.__dict__['_result_buffer'] = results
+
+    def handle_request(self, rpc_request):
+        """
+        Dispatch a single JSON-RPC request, returning the response for query
+        and context_menu requests and None for actions
+        """
+        self._expired = threading.Event()
+        self.rpc_request = rpc_request
+        self._start = time()
+        self._results = ResultBuffer()
         if 'settings' in self.rpc_request.keys():
             self._settings = self.rpc_request['settings']
+            # Drop the settings cached from an earlier request
+            self.__dict__.pop('settings', None)
             self.logger.debug('Loaded settings from RPC request')
         if not self._debug:
             self._debug = self.settings.get('debug', False)
@@ -37,20 +325,72 @@ class Launcher(object):
         request_parameters = self.rpc_request.get("parameters")
 
         request_method = getattr(self, request_method_name)
-        try:
-            results = request_method(*request_parameters) or self._results
-        except Exception as e:
-            self.logger.exception(e)
-            results = self.exception(e) or self._results
+        # Settings changed by the handler are written once, when it returns
+        settings = self.settings
+        with settings.batch() if isinstance(settings, Settings) else nullcontext():
+            if self.request_timeout is not None and request_method_name in ("_query", "_context_menu"):
+                results = self._dispatch_until_timeout(request_method, request_parameters)
+            else:
+                results = self._dispatch(request_method, request_parameters)
         line_break = '#' * 10
         ms = int((time() - self._start) * 1000)
         self.logger.debug(f'{line_break} Total time: {ms}ms {line_break}')
         if request_method_name == "_query" or request_method_name == "_context_menu":
-            results = {"result": results}
+            results = {"result": [self._serialize(result) for result in results]}
             if self._settings != self.rpc_request.get('Settings') and self._settings is not None:
                 results['SettingsChange'] = self.settings
 
-            print(json.dumps(results))
+            return results
+        return None
+
+    def _serialize(self, result):
+        """
+        the JSON layout of a result sent to the launcher
+        """
+        return result.to_dict(self.compact_results) if isinstance(result, Result) else result
+
+    def _dispatch(self, request_method, request_parameters):
+        try:
+            if self.side_store is not None:
+                request_parameters = [self.side_store.resolve(parameter) for parameter in request_parameters]
+            return self._resolve(request_method(*request_parameters)) or self._results
+        except QueryCancelled:
+            raise
+        except Exception as e:
+            self.logger.exception(e)
+            return self.exception(e) or self._results
+
+    def _dispatch_until_timeout(self, request_method, request_parameters):
+        """
+        run the handler in a worker thread, returning the results added so far
+        if it is still running once request_timeout has passed
+        """
+        outcome = {}
+        results, expired = self._results, self._expired
+
+        def target():
+            # Items added after the timeout go to this request's list, never to a later request's
+            state = self._request_state
+            state.results, state.expired = results, expired
+            try:
+                outcome['results'] = self._dispatch(request_method, request_parameters)
+            except QueryCancelled as e:
+                outcome['cancelled'] = e
+
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        worker.join(self.request_remaining)
+        if 'cancelled' in outcome:
+            raise outcome['cancelled']
+        if 'results' in outcome:
+            return outcome['results']
+        with results.lock:
+            expired.set()
+            # The handler keeps adding to its own list, the response is built from a copy
+            self._results = results.copy()
+        self.logger.warning(f'Request ran past its {self.request_timeout}s budget, returning the results so far')
+        self.on_request_timeout()
+        return self._results
 
     def query(self,query):
         """
@@ -70,6 +410,13 @@ class Launcher(object):
         """
         return []
 
+    def on_request_timeout(self):
+        """
+        called when request_timeout passes before the handler returns, items
+        added here are sent along with the results so far
+        """
+        pass
+
     def debug(self,msg):
         """
         alert msg
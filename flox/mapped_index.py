@@ -0,0 +1,250 @@
+"""
+On disk n-gram index for flox.string_matcher.
+
+Lowered texts, acronym tables and n-gram postings are written to a single
+file that is memory mapped when loaded, so a fresh plugin process can search
+without rebuilding anything. The file records the mtime and size (and
+optionally a hash) of the data it was built from and is only rebuilt when
+those change.
+"""
+import hashlib
+import json
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+from .ngram_index import BaseNgramIndex, candidate_grams
+from .string_matcher import Candidate
+
+MAGIC = b'FLOXNGR1'
+ALIGNMENT = 8
+CHAR_SIZE = 4
+ENCODING = 'utf-32-le'
+# Lone surrogates, e.g. from undecodable Windows file names, are stored as is
+ERRORS = 'surrogatepass'
+
+
+def source_stamp(source_path: Union[str, Path], use_hash: bool = False) -> Dict:
+    """Identify the current state of the file an index is built from"""
+    stat = Path(source_path).stat()
+    stamp = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if use_hash:
+        digest = hashlib.sha1()
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        stamp['sha1'] = digest.hexdigest()
+    return stamp
+
+
+def write_index(path: Union[str, Path], texts: Iterable[str], source: Dict = None) -> None:
+    """Build the index of texts and write it to path, replacing any previous index atomically"""
+    text_offsets = array('q', [0])
+    lower_offsets = array('q', [0])
+    texts_blob: List[str] = []
+    lowers_blob: List[str] = []
+    acronym = bytearray()
+    acronym_count = bytearray()
+    acronym_count_lower = bytearray()
+    acronym_limit = array('q')
+    has_digits = bytearray()
+    unfiltered = array('I')
+    postings: Dict[str, List[int]] = {}
+
+    for candidate_id, text in enumerate(texts):
+        candidate = Candidate(text or '')
+        flags, count_flags, count_lower_flags = candidate.tables()
+        limit, digits = candidate.acronym_stats()
+        texts_blob.append(candidate.text)
+        lowers_blob.append(candidate.lower)
+        text_offsets.append(text_offsets[-1] + len(candidate.text))
+        lower_offsets.append(lower_offsets[-1] + len(candidate.lower))
+        acronym.extend(flags)
+        acronym_count.extend(count_flags)
+        acronym_count_lower.extend(count_lower_flags)
+        acronym_limit.append(limit)
+        has_digits.append(digits)
+        if len(candidate.lower) != len(candidate.text):
+            unfiltered.append(candidate_id)
+        for gram in candidate_grams(candidate):
+            postings.setdefault(gram, []).append(candidate_id)
+
+    # Grams are sorted by their utf-8 bytes, which is code point order, so lookups can bisect the raw bytes
+    grams = sorted((gram.encode('utf-8', ERRORS), ids) for gram, ids in postings.items())
+    gram_offsets = array('q', [0])
+    posting_offsets = array('q', [0])
+    posting_ids = array('I')
+    for gram, ids in grams:
+        gram_offsets.append(gram_offsets[-1] + len(gram))
+        posting_ids.extend(ids)
+        posting_offsets.append(len(posting_ids))
+
+    sections = [
+        ('text_offsets', 'q', text_offsets.tobytes()),
+        ('texts', 'B', ''.join(texts_blob).encode(ENCODING, ERRORS)),
+        ('lower_offsets', 'q', lower_offsets.tobytes()),
+        ('lowers', 'B', ''.join(lowers_blob).encode(ENCODING, ERRORS)),
+        ('acronym', 'B', bytes(acronym)),
+        ('acronym_count', 'B', bytes(acronym_count)),
+        ('acronym_count_lower', 'B', bytes(acronym_count_lower)),
+        ('acronym_limit', 'q', acronym_limit.tobytes()),
+        ('has_digits', 'B', bytes(has_digits)),
+        ('unfiltered', 'I', unfiltered.tobytes()),
+        ('gram_offsets', 'q', gram_offsets.tobytes()),
+        ('grams', 'B', b''.join(gram for gram, _ in grams)),
+        ('posting_offsets', 'q', posting_offsets.tobytes()),
+        ('postings', 'I', posting_ids.tobytes()),
+    ]
+    layout = {}
+    offset = 0
+    for name, typecode, data in sections:
+        layout[name] = [offset, len(data), typecode]
+        offset += len(data) + -len(data) % ALIGNMENT
+    header = json.dumps({'source': source, 'count': len(text_offsets) - 1, 'sections': layout}).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+    body_start = len(MAGIC) + 4 + len(header)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        for name, _, data in sections:
+            f.seek(body_start + layout[name][0])
+            f.write(data)
+        f.truncate(body_start + offset)
+    os.replace(tmp_path, path)
+
+
+class MappedNgramIndex(BaseNgramIndex):
+    """Read only index memory mapped from a file written by write_index, items are the text positions"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._sections = {}
+        self._candidates: Dict[int, Candidate] = {}
+        try:
+            self._parse()
+        except (TypeError, KeyError, IndexError) as e:
+            self.close()
+            raise ValueError(f'Corrupt flox index: {self.path}') from e
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self) -> None:
+        """Read the header and map every section, raising ValueError when the file is truncated"""
+        size = len(self._mmap)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'Not a flox index: {self.path}')
+        header_length = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 4], 'little')
+        body_start = len(MAGIC) + 4
+        if body_start + header_length > size:
+            raise ValueError(f'Truncated flox index: {self.path}')
+        header = json.loads(self._mmap[body_start:body_start + header_length].decode('utf-8'))
+        body_start += header_length
+        for name, (offset, length, typecode) in header['sections'].items():
+            start = body_start + offset
+            if offset < 0 or length < 0 or start + length > size:
+                raise ValueError(f'Truncated flox index: {self.path}')
+            self._sections[name] = self._view[start:start + length].cast(typecode)
+        self.source: Optional[Dict] = header['source']
+        self.count: int = header['count']
+        self._unfiltered = set(self._sections['unfiltered'])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Release the memory map"""
+        self._candidates = {}
+        for section in self._sections.values():
+            section.release()
+        self._sections = {}
+        self._view.release()
+        self._mmap.close()
+
+    def _gram(self, position: int) -> bytes:
+        offsets = self._sections['gram_offsets']
+        return self._sections['grams'][offsets[position]:offsets[position + 1]].tobytes()
+
+    def posting(self, gram: str) -> Set[int]:
+        key = gram.encode('utf-8', ERRORS)
+        low, high = 0, len(self._sections['gram_offsets']) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self._gram(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low >= len(self._sections['gram_offsets']) - 1 or self._gram(low) != key:
+            return set()
+        offsets = self._sections['posting_offsets']
+        return set(self._sections['postings'][offsets[low]:offsets[low + 1]])
+
+    def ids(self) -> Set[int]:
+        return set(range(self.count))
+
+    def unfiltered_ids(self) -> Set[int]:
+        return set(self._unfiltered)
+
+    def text(self, candidate_id: int) -> str:
+        offsets = self._sections['text_offsets']
+        return self._sections['texts'][offsets[candidate_id] * CHAR_SIZE:offsets[candidate_id + 1] * CHAR_SIZE].tobytes().decode(ENCODING, ERRORS)
+
+    def candidate(self, candidate_id: int) -> Candidate:
+        candidate = self._candidates.get(candidate_id)
+        if candidate is None:
+            sections = self._sections
+            start, end = sections['text_offsets'][candidate_id], sections['text_offsets'][candidate_id + 1]
+            lower_start, lower_end = sections['lower_offsets'][candidate_id], sections['lower_offsets'][candidate_id + 1]
+            candidate = self._candidates[candidate_id] = Candidate.from_tables(
+                sections['texts'][start * CHAR_SIZE:end * CHAR_SIZE].tobytes().decode(ENCODING, ERRORS),
+                sections['lowers'][lower_start * CHAR_SIZE:lower_end * CHAR_SIZE].tobytes().decode(ENCODING, ERRORS),
+                sections['acronym'][start:end].tobytes(),
+                sections['acronym_count'][start:end].tobytes(),
+                sections['acronym_count_lower'][lower_start:lower_end].tobytes(),
+                (sections['acronym_limit'][candidate_id], bool(sections['has_digits'][candidate_id])),
+            )
+        return candidate
+
+    def item(self, candidate_id: int) -> int:
+        return candidate_id
+
+
+def load_index(path: Union[str, Path], source_path: Union[str, Path], texts: Callable[[], Iterable[str]], use_hash: bool = False) -> BaseNgramIndex:
+    """
+    Return the index stored at path, rebuilding it from texts() when source_path has changed.
+
+    Falls back to an in memory index when the file can't be replaced, for
+    example while another plugin process still has it mapped on Windows.
+    """
+    stamp = source_stamp(source_path, use_hash)
+    try:
+        index = MappedNgramIndex(path)
+    except (OSError, ValueError, KeyError):
+        index = None
+    if index is not None:
+        if index.source == stamp:
+            return index
+        index.close()
+    entries = list(texts())
+    try:
+        write_index(path, entries, stamp)
+    except PermissionError:
+        from .ngram_index import NgramIndex
+        return NgramIndex(range(len(entries)), key=entries.__getitem__)
+    return MappedNgramIndex(path)
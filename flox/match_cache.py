@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+from .string_matcher import DEFAULT_QUERY_SEARCH_PRECISION, MatchData, string_matcher
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 10000
+
+CacheKey = Tuple[str, str, bool, int]
+
+
+class MatchCache:
+    """
+    Bounded LRU cache of string_matcher results.
+
+    When path is given the cache is loaded from it on creation and written
+    back by save(), so later plugin processes start with the same entries.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, path: Union[str, Path] = None):
+        self.capacity = capacity
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[CacheKey, Tuple]' = OrderedDict()
+        self._dirty = False
+        if self.path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self._entries
+
+    def match(self, query: str, text: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> MatchData:
+        """Cached string_matcher"""
+        key = (query, text, ignore_case, query_search_precision)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            matched, score_cutoff, index_list, score = entry
+            return MatchData(matched, score_cutoff, list(index_list), score)
+        self.misses += 1
+        match = string_matcher(query, text, ignore_case, query_search_precision)
+        self._store(key, (match.matched, match.score_cutoff, tuple(match.index_list), match.score))
+        return match
+
+    def _store(self, key: CacheKey, entry: Tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'capacity': self.capacity}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = True
+
+    def load(self) -> None:
+        """Read entries saved by an earlier process"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            log.warning('Unable to read match cache: %s', self.path)
+            return
+        if self.capacity <= 0:
+            return
+        entries = OrderedDict()
+        try:
+            if not isinstance(rows, list):
+                raise TypeError(rows)
+            for query, text, ignore_case, query_search_precision, matched, score_cutoff, index_list, score in rows[-self.capacity:]:
+                entries[(query, text, ignore_case, query_search_precision)] = (matched, score_cutoff, tuple(index_list), score)
+        except (TypeError, ValueError):
+            log.warning('Ignoring malformed match cache: %s', self.path)
+            return
+        self._entries.update(entries)
+        self._dirty = False
+
+    def save(self) -> None:
+        """Write the entries to path, oldest first, if anything changed"""
+        if not self.path or not self._dirty:
+            return
+        rows = [list(key) + [matched, score_cutoff, list(index_list), score] for key, (matched, score_cutoff, index_list, score) in self._entries.items()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+_default_cache = MatchCache()
+
+
+def cached_string_matcher(query: str, text: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> MatchData:
+    """string_matcher memoized in a process wide MatchCache"""
+    return _default_cache.match(query, text, ignore_case, query_search_precision)
+
+
+def default_cache() -> MatchCache:
+    """The MatchCache used by cached_string_matcher"""
+    return _default_cache
@@ -0,0 +1,189 @@
+from heapq import heappush, heapreplace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .string_matcher import (
+    Candidate,
+    CompiledQuery,
+    DEFAULT_QUERY_SEARCH_PRECISION,
+    MatchData,
+    SPACE_CHAR,
+    compile_query,
+)
+
+"""
+Inverted n-gram index for flox.string_matcher.
+
+Flow Launcher's matcher accepts query characters anywhere in order, so only
+single character postings can rule candidates out. Bigram, trigram and
+acronym initial postings find the likely best candidates, which are scored
+first so the top k cutoff rises early and the remaining candidates are
+mostly rejected on their score bound.
+"""
+
+ACRONYM_PREFIX = '^'
+MAX_GRAM_SIZE = 3
+
+
+def acronym_initials(candidate: Candidate) -> str:
+    """Lowered characters at the acronym positions of candidate"""
+    acronym, _, _ = candidate.tables()
+    lower = candidate.lower
+    if len(lower) != len(acronym):
+        return ''
+    return ''.join(lower[i] for i, flag in enumerate(acronym) if flag)
+
+
+def candidate_grams(candidate: Candidate) -> Set[str]:
+    """Posting keys of candidate"""
+    lower = candidate.lower
+    grams = set(lower)
+    for size in range(2, MAX_GRAM_SIZE + 1):
+        grams.update(lower[i:i + size] for i in range(len(lower) - size + 1))
+    initials = acronym_initials(candidate)
+    grams.update(ACRONYM_PREFIX + initials[:size] for size in range(1, min(len(initials), MAX_GRAM_SIZE) + 1))
+    return grams
+
+
+def query_grams(compiled: CompiledQuery) -> List[str]:
+    """Posting keys shared by the candidates expected to score best for compiled"""
+    query_lower = compiled.query.lower()
+    grams = [substring[:MAX_GRAM_SIZE] for substring in query_lower.split(SPACE_CHAR) if len(substring) > 1]
+    return grams
+
+
+class BaseNgramIndex:
+    """Search over character, n-gram and acronym postings, storage is left to subclasses"""
+
+    def posting(self, gram: str) -> Set[int]:
+        """Ids of candidates containing gram"""
+        raise NotImplementedError
+
+    def ids(self) -> Set[int]:
+        raise NotImplementedError
+
+    def unfiltered_ids(self) -> Set[int]:
+        """Ids of texts whose length changes when lowercased, the character filter can't be applied to them"""
+        raise NotImplementedError
+
+    def candidate(self, candidate_id: int) -> Candidate:
+        raise NotImplementedError
+
+    def item(self, candidate_id: int) -> Any:
+        raise NotImplementedError
+
+    def candidate_ids(self, compiled: CompiledQuery) -> Set[int]:
+        """Ids of candidates that can match compiled"""
+        if not compiled.prefilter:
+            return self.ids()
+        ids: Optional[Set[int]] = None
+        for char in set(compiled.query.lower().replace(SPACE_CHAR, '')):
+            postings = self.posting(char)
+            if not postings:
+                return self.unfiltered_ids()
+            ids = postings if ids is None else ids & postings
+        return (ids if ids is not None else self.ids()) | self.unfiltered_ids()
+
+    def seed_ids(self, compiled: CompiledQuery, ids: Set[int]) -> Set[int]:
+        """Ids among ids whose text contains the query words' leading n-grams or acronym initials"""
+        seeds: Optional[Set[int]] = None
+        for gram in query_grams(compiled):
+            seeds = self.posting(gram) & ids if seeds is None else seeds & self.posting(gram)
+        seeds = seeds or set()
+        acronym = self.posting(ACRONYM_PREFIX + compiled.query.lower()[:MAX_GRAM_SIZE])
+        if acronym:
+            seeds |= acronym & ids
+        return seeds
+
+    def search(self, query: str, k: int = 50, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> List[Tuple[Any, MatchData]]:
+        """Return the k best matches as (item, MatchData), best first, ties in id order"""
+        compiled = compile_query(query, ignore_case, query_search_precision)
+        if (k is not None and k <= 0) or not compiled.query:
+            return []
+        ids = self.candidate_ids(compiled)
+        seeds = self.seed_ids(compiled, ids)
+        ordered = sorted(seeds) + sorted(ids - seeds)
+
+        heap: List[Tuple[float, int]] = []
+        for candidate_id in ordered:
+            candidate = self.candidate(candidate_id)
+            full = k is not None and len(heap) >= k
+            max_score = compiled.max_score(candidate)
+            if max_score < query_search_precision or (full and max_score < heap[0][0]):
+                continue
+            score = compiled.score(candidate)
+            if score is None or score < query_search_precision:
+                continue
+            # Seeds are scored out of order, so ties are broken on id explicitly
+            entry = (score, -candidate_id)
+            if not full:
+                heappush(heap, entry)
+            elif entry > heap[0]:
+                heapreplace(heap, entry)
+
+        heap.sort(reverse=True)
+        return [(self.item(-candidate_id), compiled.match(self.candidate(-candidate_id))) for _, candidate_id in heap]
+
+
+class NgramIndex(BaseNgramIndex):
+    """Candidates keyed by id with character, n-gram and acronym postings"""
+
+    def __init__(self, items: Iterable = (), key: Callable[[Any], str] = None):
+        self.key = key
+        self.items: Dict[int, Any] = {}
+        self.candidates: Dict[int, Candidate] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.unfiltered: Set[int] = set()
+        self._next_id = 0
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, candidate_id: int) -> bool:
+        return candidate_id in self.items
+
+    def posting(self, gram: str) -> Set[int]:
+        return self.postings.get(gram, set())
+
+    def ids(self) -> Set[int]:
+        return set(self.items)
+
+    def unfiltered_ids(self) -> Set[int]:
+        return set(self.unfiltered)
+
+    def candidate(self, candidate_id: int) -> Candidate:
+        return self.candidates[candidate_id]
+
+    def item(self, candidate_id: int) -> Any:
+        return self.items[candidate_id]
+
+    def add(self, item, candidate_id: int = None) -> int:
+        """Index item and return its id"""
+        if candidate_id is None:
+            candidate_id = self._next_id
+        elif candidate_id in self.items:
+            self.remove(candidate_id)
+        self._next_id = max(self._next_id, candidate_id + 1)
+        candidate = Candidate((self.key(item) if self.key else item) or '')
+        self.items[candidate_id] = item
+        self.candidates[candidate_id] = candidate
+        if len(candidate.lower) != len(candidate.text):
+            self.unfiltered.add(candidate_id)
+        for gram in candidate_grams(candidate):
+            self.postings.setdefault(gram, set()).add(candidate_id)
+        return candidate_id
+
+    def extend(self, items: Iterable) -> List[int]:
+        return [self.add(item) for item in items]
+
+    def remove(self, candidate_id: int) -> None:
+        """Drop candidate_id from the index"""
+        candidate = self.candidates.pop(candidate_id)
+        del self.items[candidate_id]
+        self.unfiltered.discard(candidate_id)
+        for gram in candidate_grams(candidate):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(candidate_id)
+                if not ids:
+                    del self.postings[gram]
@@ -0,0 +1,101 @@
+import os
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+from .string_matcher import CandidateIndex, DEFAULT_QUERY_SEARCH_PRECISION
+
+"""
+Parallel search for flox.string_matcher.
+
+The candidate texts are encoded once into shared memory. Every shard of the
+corpus is pinned to its own worker process, which decodes its slice on the
+first query and keeps a CandidateIndex for it, so a query only sends the
+query string to the workers. Per shard top k results are merged in the
+parent.
+"""
+
+OFFSET_SIZE = array('q').itemsize
+CHAR_SIZE = 4
+
+# Shard indexes built by this worker process, keyed on (shared memory name, start, end)
+_shards: Dict[Tuple[str, int, int], CandidateIndex] = {}
+
+
+def _load_shard(name: str, count: int, start: int, end: int) -> CandidateIndex:
+    key = (name, start, end)
+    if key not in _shards:
+        shm = SharedMemory(name=name)
+        try:
+            offsets = shm.buf[:OFFSET_SIZE * (count + 1)].cast('q')
+            base = OFFSET_SIZE * (count + 1)
+            first = offsets[start]
+            data = bytes(shm.buf[base + first * CHAR_SIZE:base + offsets[end] * CHAR_SIZE]).decode('utf-32-le', 'surrogatepass')
+            texts = [data[offsets[i] - first:offsets[i + 1] - first] for i in range(start, end)]
+            offsets.release()
+        finally:
+            shm.close()
+        _shards[key] = CandidateIndex(range(start, end), key=lambda position: texts[position - start], workers=1)
+    return _shards[key]
+
+
+def _search_shard(name: str, count: int, start: int, end: int, query: str, k: Optional[int], ignore_case: bool, query_search_precision: int) -> List[Tuple[float, int]]:
+    index = _load_shard(name, count, start, end)
+    return [(match.score, position) for position, match in index.search(query, k, ignore_case, query_search_precision)]
+
+
+def _release(shm: SharedMemory, executors: List[ProcessPoolExecutor]) -> None:
+    for executor in executors:
+        executor.shutdown(wait=False)
+    shm.close()
+    shm.unlink()
+
+
+class SharedCorpus:
+    """Candidate texts in shared memory, searched by a pool of worker processes"""
+
+    def __init__(self, texts: List[str], workers: int = None):
+        count = len(texts)
+        workers = max(1, min(workers or os.cpu_count() or 1, count or 1))
+        offsets = array('q', [0])
+        for text in texts:
+            offsets.append(offsets[-1] + len(text))
+        data = ''.join(texts).encode('utf-32-le', 'surrogatepass')
+        header = offsets.tobytes()
+
+        self.count = count
+        self.shm = SharedMemory(create=True, size=max(1, len(header) + len(data)))
+        self.shm.buf[:len(header)] = header
+        self.shm.buf[len(header):len(header) + len(data)] = data
+        bounds = [count * i // workers for i in range(workers + 1)]
+        self.shards = [(bounds[i], bounds[i + 1]) for i in range(workers) if bounds[i] < bounds[i + 1]]
+        # One single worker pool per shard keeps each shard's index warm in one process
+        self.executors = [ProcessPoolExecutor(max_workers=1) for _ in self.shards]
+        self._finalizer = weakref.finalize(self, _release, self.shm, self.executors)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory"""
+        self._finalizer()
+
+    def search(self, query: str, k: Optional[int] = 50, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> List[Tuple[int, float]]:
+        """Return the positions and scores of the k best matches, best first"""
+        futures = [
+            executor.submit(_search_shard, self.shm.name, self.count, start, end, query, k, ignore_case, query_search_precision)
+            for executor, (start, end) in zip(self.executors, self.shards)
+        ]
+        merged = [entry for future in futures for entry in future.result()]
+        merged.sort(key=lambda entry: (-entry[0], entry[1]))
+        if k is not None:
+            merged = merged[:k]
+        return [(position, score) for score, position in merged]
@@ -0,0 +1,51 @@
+"""
+Run several result providers for a query at once and collect what they yield.
+
+A provider is a callable taking the query and returning or yielding
+add_item keyword dicts, e.g. {'title': 'Firefox', 'score': 80}.
+"""
+import logging
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+log = logging.getLogger(__name__)
+
+Provider = Callable[[str], Iterable[dict]]
+
+
+def default_key(item: dict) -> Hashable:
+    """Items with the same title and subtitle are duplicates"""
+    return (item.get('title'), item.get('subtitle', ''))
+
+
+def _timed(provider: Provider, query: str) -> Tuple[List[dict], float]:
+    start = perf_counter()
+    items = list(provider(query) or [])
+    return items, perf_counter() - start
+
+
+def fan_out(executor: 'Executor', providers: Dict[str, Provider], query: str, timeout: Optional[float] = None) -> Iterator[Tuple[str, List[dict], float]]:
+    """
+    Run every provider on executor and yield (name, items, seconds) as each
+    one finishes. Providers that raise are logged and left out, as are
+    providers still running after timeout.
+    """
+    from concurrent.futures import TimeoutError, as_completed
+    futures = {executor.submit(_timed, provider, query): name for name, provider in providers.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            name = futures[future]
+            try:
+                items, seconds = future.result()
+            except Exception:
+                log.exception('Provider %s failed', name)
+                continue
+            yield name, items, seconds
+    except TimeoutError:
+        for future, name in futures.items():
+            if not future.done():
+                log.warning('Provider %s still running after %ss, skipping it', name, timeout)
+                future.cancel()
@@ -0,0 +1,201 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# JSON key -> Result attribute for the plain fields of a result
+FIELDS = {
+    'Title': 'title',
+    'SubTitle': 'subtitle',
+    'IcoPath': 'icon',
+    'ContextData': 'context',
+    'Score': 'score',
+    'AutoCompleteText': 'auto_complete_text',
+}
+# JSON key -> (Result attribute, value when the key is removed) of the nested JsonRPCAction and Glyph fields
+ACTION_FIELDS = {
+    'method': ('method', None),
+    'parameters': ('parameters', []),
+    'dontHideAfterAction': ('dont_hide', False),
+}
+GLYPH_FIELDS = {
+    'Glyph': ('glyph', None),
+    'FontFamily': ('font_family', None),
+}
+
+
+class AttributeDict(dict):
+    """
+    Nested field of a Result, e.g. result['JsonRPCAction'], as a dict whose
+    changes are written back to the Result's attributes
+    """
+
+    __slots__ = ('_result', '_fields')
+
+    def __init__(self, result: 'Result', fields: Dict[str, Tuple[str, Any]], values: Dict[str, Any]):
+        super(AttributeDict, self).__init__(values)
+        self._result = result
+        self._fields = fields
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super(AttributeDict, self).__setitem__(key, value)
+        if key in self._fields:
+            setattr(self._result, self._fields[key][0], value)
+
+    def __delitem__(self, key: str) -> None:
+        super(AttributeDict, self).__delitem__(key)
+        if key in self._fields:
+            setattr(self._result, *self._fields[key])
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self) -> Tuple[str, Any]:
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def clear(self) -> None:
+        for key in list(self):
+            del self[key]
+
+
+class Result(object):
+    """
+    A launcher result. to_dict() gives the JSON layout the launcher expects,
+    and the JSON keys can be read and set like on a dict, e.g. result['Score'].
+    Changes made to result['JsonRPCAction'] and result['Glyph'] are kept too.
+    """
+
+    __slots__ = ('title', 'subtitle', 'icon', 'context', 'score', 'auto_complete_text',
+                 'method', 'parameters', 'dont_hide', 'glyph', 'font_family', 'extra')
+
+    def __init__(self, title: str, subtitle: str, icon: str, context: Any = None, score: int = 0, auto_complete_text: str = None):
+        self.title = title
+        self.subtitle = subtitle
+        self.icon = icon
+        self.context = context
+        self.score = score
+        self.auto_complete_text = auto_complete_text
+        self.method = None
+        self.parameters = None
+        self.dont_hide = False
+        self.glyph = None
+        self.font_family = None
+        self.extra: Optional[Dict[str, Any]] = None
+
+    def __repr__(self) -> str:
+        return f'Result({self.to_dict()!r})'
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Result):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def action(self) -> Dict[str, Any]:
+        if self.method is None:
+            return {}
+        return {'method': self.method, 'parameters': self.parameters, 'dontHideAfterAction': self.dont_hide}
+
+    def to_dict(self, compact: bool = False) -> Dict[str, Any]:
+        """
+        The launcher's JSON layout, compact leaves out ContextData, Score and
+        JsonRPCAction when they hold the launcher's defaults
+        """
+        if compact:
+            item = {"Title": self.title, "SubTitle": self.subtitle, "IcoPath": self.icon}
+            if self.context is not None:
+                item["ContextData"] = self.context
+            if self.score:
+                item["Score"] = self.score
+            if self.method is not None:
+                item["JsonRPCAction"] = self.action()
+            item["AutoCompleteText"] = self.auto_complete_text
+        else:
+            item = {
+                "Title": self.title,
+                "SubTitle": self.subtitle,
+                "IcoPath": self.icon,
+                "ContextData": self.context,
+                "Score": self.score,
+                "JsonRPCAction": self.action(),
+                "AutoCompleteText": self.auto_complete_text,
+            }
+        if self.glyph is not None:
+            item['Glyph'] = {'Glyph': self.glyph, 'FontFamily': self.font_family}
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+    def __getitem__(self, key: str) -> Any:
+        if key in FIELDS:
+            return getattr(self, FIELDS[key])
+        if key == 'JsonRPCAction':
+            return AttributeDict(self, ACTION_FIELDS, self.action())
+        if key == 'Glyph' and self.glyph is not None:
+            return AttributeDict(self, GLYPH_FIELDS, {'Glyph': self.glyph, 'FontFamily': self.font_family})
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in FIELDS:
+            setattr(self, FIELDS[key], value)
+        elif key == 'JsonRPCAction':
+            self.method = value.get('method')
+            self.parameters = value.get('parameters', [])
+            self.dont_hide = value.get('dontHideAfterAction', False)
+        elif key == 'Glyph':
+            self.glyph = value['Glyph']
+            self.font_family = value['FontFamily']
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class ResultBuffer(list):
+    """
+    Items added during one request, along with the heap add_item keeps of
+    the highest scores when max_results is set. Changes are made holding
+    lock, a request that timed out copies the items while its handler may
+    still be adding more.
+    """
+
+    def __init__(self, *args):
+        super(ResultBuffer, self).__init__(*args)
+        self.top: List[Tuple[int, int, Result]] = []
+        self.added = 0
+        self.lock = threading.RLock()
+
+    def copy(self) -> 'ResultBuffer':
+        with self.lock:
+            copy = ResultBuffer(self)
+            copy.top = list(self.top)
+            copy.added = self.added
+        return copy
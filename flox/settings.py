@@ -1,53 +1,152 @@
+from contextlib import contextmanager, suppress
 from pathlib import Path
 import json
+import logging
+import os
+import threading
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# path -> ((mtime_ns, size), parsed Settings.json) shared by every LauncherSettings
+_launcher_settings_cache = {}
+
+
+class LauncherSettings(object):
+    """
+    Read only view of the launcher's Settings.json, parsed again only when
+    the file's mtime or size changes. The parsed data is shared, don't modify it.
+    """
+
+    def __init__(self, filepath):
+        self._filepath = filepath
+
+    @property
+    def data(self):
+        stat = os.stat(self._filepath)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = _launcher_settings_cache.get(self._filepath)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with open(self._filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        _launcher_settings_cache[self._filepath] = (stamp, data)
+        return data
+
+    def get(self, *keys, default=None):
+        """
+        the subtree under keys, e.g. get('PluginSettings', 'PythonDirectory'), or default when missing
+        """
+        value = self.data
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
 
 class Settings(dict):
+    """
+    Plugin settings saved to a JSON file. Changes are written atomically and
+    only once per batch(), Launcher batches every request.
+    """
 
     def __init__(self, filepath):
         super(Settings, self).__init__()
         self._filepath = filepath
-        self._save = True
+        self._dirty = False
+        self._batches = 0
+        self._lock = threading.Lock()
         if Path(self._filepath).exists():
             self._load()
         else:
-            data = {}
-            self.update(data)
             self.save()
 
-        
     def _load(self):
-        data = {}
-        with open(self._filepath, 'r') as f:
-            try:
-                data.update(json.load(f))
-            except json.decoder.JSONDecodeError:
-                pass
+        try:
+            with open(self._filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.decoder.JSONDecodeError:
+            # Keep the unreadable file around instead of overwriting it on the next save
+            corrupt_file = f'{self._filepath}.corrupt'
+            log.warning('Unable to read settings file %s, moved it to %s', self._filepath, corrupt_file)
+            os.replace(self._filepath, corrupt_file)
+            return
+        super(Settings, self).update(data)
 
-        self._save = False
-        self.update(data)
-        self._save = True
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @contextmanager
+    def batch(self):
+        """
+        Write the changes made in the block once, when it exits. A failed
+        write is logged instead of raised, the changes stay dirty and are
+        written again by the next save or flush.
+        """
+        self._batches += 1
+        try:
+            yield self
+        finally:
+            self._batches -= 1
+            if not self._batches:
+                try:
+                    self.flush()
+                except Exception:
+                    # Raising here would replace the block's own result or exception
+                    log.exception('Unable to write settings file %s', self._filepath)
 
     def save(self):
-        if self._save:
-            data = {}
-            data.update(self)
-            with open(self._filepath, 'w') as f:
-                json.dump(data, f, sort_keys=True, indent=4)
-        return
-    
-    def __setitem__(self, key, value):
+        """Write the settings now, or when the current batch exits"""
+        self._dirty = True
+        if not self._batches:
+            self.flush()
+
+    def flush(self):
+        """Write the settings if they changed since the last write"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self)
+            tmp_file = f'{self._filepath}.{os.getpid()}.tmp'
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, sort_keys=True, indent=4)
+                os.replace(tmp_file, self._filepath)
+            finally:
+                # Only left behind when writing or replacing failed
+                with suppress(OSError):
+                    os.remove(tmp_file)
+            self._dirty = False
+
+    def _set(self, key, value):
+        """set key, returning whether that changed the settings"""
+        current = self.get(key, _MISSING)
         super(Settings, self).__setitem__(key, value)
-        self.save()
+        if current is value:
+            # The same list or dict may have been changed in place before being set again
+            return not isinstance(value, (str, int, float, bool, type(None), tuple))
+        return current is _MISSING or current != value
+
+    def __setitem__(self, key, value):
+        if self._set(key, value):
+            self.save()
 
     def __delitem__(self, key):
         super(Settings, self).__delitem__(key)
         self.save()
 
     def update(self, *args, **kwargs):
-        super(Settings, self).update(*args, **kwargs)
-        self.save()
+        changed = False
+        for key, value in dict(*args, **kwargs).items():
+            changed = self._set(key, value) or changed
+        if changed:
+            self.save()
 
     def setdefault(self, key, value=None):
-        ret = super(Settings, self).setdefault(key, value)
-        self.save()
-        return ret
+        if key in self:
+            return self[key]
+        self[key] = value
+        return value
@@ -0,0 +1,98 @@
+"""
+Keep large ContextData and action parameters out of the JSON-RPC payloads.
+
+Values are swapped for a short token when results are sent and looked up
+again when the launcher passes the token back. A long lived plugin process
+keeps them in memory, otherwise they go to small files shared by the short
+lived processes the launcher starts for each request.
+"""
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Union
+
+log = logging.getLogger(__name__)
+
+TOKEN_PREFIX = 'flox-side-store:'
+DEFAULT_CAPACITY = 1000
+
+
+def is_token(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(TOKEN_PREFIX)
+
+
+class SideStore(object):
+    """
+    Token -> value store, tokens are derived from the value's JSON so equal
+    values share one entry. Only the capacity most recently stored entries
+    are kept, in memory and on disk.
+    """
+
+    def __init__(self, path: Union[str, Path] = None, capacity: int = DEFAULT_CAPACITY):
+        self.path = Path(path) if path else None
+        self.capacity = capacity
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._pruned = False
+
+    def put(self, value: Any, data: str = None) -> str:
+        """Store value and return its token, data is value's JSON when already encoded"""
+        import hashlib
+        if data is None:
+            data = json.dumps(value)
+        token = TOKEN_PREFIX + hashlib.sha1(data.encode('utf-8')).hexdigest()[:20]
+        self._entries[token] = value
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        if self.path:
+            self._write(token, data)
+        return token
+
+    def get(self, token: str) -> Any:
+        if token in self._entries:
+            return self._entries[token]
+        if self.path:
+            try:
+                with open(self._file(token), 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        raise KeyError(f'{token} is no longer in the side store, run the query again')
+
+    def resolve(self, value: Any) -> Any:
+        """value, or what it stands for if it is a token"""
+        return self.get(value) if is_token(value) else value
+
+    def _file(self, token: str) -> Path:
+        return self.path.joinpath(token[len(TOKEN_PREFIX):] + '.json')
+
+    def _write(self, token: str, data: str) -> None:
+        file = self._file(token)
+        try:
+            if file.exists():
+                # Refresh the mtime so pruning keeps recently sent values
+                os.utime(file)
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_file = file.with_name(f'{file.name}.{os.getpid()}.tmp')
+            tmp_file.write_text(data, encoding='utf-8')
+            os.replace(tmp_file, file)
+        except OSError:
+            log.warning('Unable to write side store entry: %s', file)
+        if not self._pruned:
+            self._pruned = True
+            self.prune()
+
+    def prune(self) -> None:
+        """Remove the oldest files beyond capacity"""
+        try:
+            files = sorted(self.path.glob('*.json'), key=lambda file: file.stat().st_mtime, reverse=True)
+        except OSError:
+            return
+        for file in files[self.capacity:]:
+            try:
+                file.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,172 @@
+"""
+SQLite backed storage for plugin state that is too big to load and rewrite
+as one JSON file, like history, frecency counters or large catalogs.
+
+Every table maps string keys to JSON values and is indexed on its key, so
+lookups, prefix queries and writes only touch the rows involved.
+"""
+import json
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+DEFAULT_TABLE = 'data'
+TABLE_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix, None if there is none"""
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class Table(object):
+    """
+    Key -> JSON value table of a Store, use it like a dict
+    """
+
+    def __init__(self, store: 'Store', name: str):
+        self.store = store
+        self.name = name
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self.store.execute(f'SELECT value FROM "{self.name}" WHERE key = ?', (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        self.store.execute(f'INSERT OR REPLACE INTO "{self.name}" (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    def put_many(self, items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]) -> None:
+        """Insert or replace many (key, value) pairs in one transaction"""
+        if isinstance(items, Mapping):
+            items = items.items()
+        rows = ((key, json.dumps(value)) for key, value in items)
+        with self.store.transaction():
+            self.store.executemany(f'INSERT OR REPLACE INTO "{self.name}" (key, value) VALUES (?, ?)', rows)
+
+    def increment(self, key: str, amount: Union[int, float] = 1) -> Union[int, float]:
+        """
+        Add amount to the number stored at key, starting from 0, and return the new value.
+        Raises TypeError when key holds something other than a number.
+        """
+        # Added in Python, SQLite arithmetic turns integers too big for 64 bits into floats
+        with self.store.transaction(immediate=True):
+            value = self.get(key, 0)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise TypeError(f'{key!r} does not hold a number: {value!r}')
+            value += amount
+            self.set(key, value)
+            return value
+
+    def delete(self, key: str) -> None:
+        self.store.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+
+    def prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        """(key, value) pairs whose key starts with prefix, ordered by key"""
+        sql = f'SELECT key, value FROM "{self.name}" WHERE key >= ?'
+        params = [prefix]
+        end = _prefix_end(prefix)
+        if end is not None:
+            sql += ' AND key < ?'
+            params.append(end)
+        sql += ' ORDER BY key'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [(key, json.loads(value)) for key, value in self.store.execute(sql, params).fetchall()]
+
+    def keys(self) -> List[str]:
+        return [key for key, in self.store.execute(f'SELECT key FROM "{self.name}" ORDER BY key').fetchall()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return self.prefix('')
+
+    def clear(self) -> None:
+        self.store.execute(f'DELETE FROM "{self.name}"')
+
+    def __getitem__(self, key: str) -> Any:
+        row = self.store.execute(f'SELECT value FROM "{self.name}" WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if self.store.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,)).rowcount == 0:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.store.execute(f'SELECT 1 FROM "{self.name}" WHERE key = ?', (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.store.execute(f'SELECT COUNT(*) FROM "{self.name}"').fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+
+class Store(object):
+    """
+    SQLite database in WAL mode holding any number of Tables, created on first use.
+
+    Statements run in autocommit mode unless they are inside transaction().
+    The connection is shared by the plugin's threads, one statement at a time.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._connection = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+
+    def table(self, name: str = DEFAULT_TABLE) -> Table:
+        if name not in self._tables:
+            if not TABLE_NAME.match(name):
+                raise ValueError(f'Invalid table name: {name!r}')
+            self.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID')
+            self._tables[name] = Table(self, name)
+        return self._tables[name]
+
+    def __getitem__(self, name: str) -> Table:
+        return self.table(name)
+
+    def execute(self, sql: str, params: Iterable = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connection.execute(sql, params)
+
+    def executemany(self, sql: str, rows: Iterable) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connection.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        Commit the statements run in the block together, or none of them if it raises.
+        immediate takes the write lock up front, for blocks that read a value and write
+        it back without another process writing in between.
+        """
+        with self._lock:
+            if self._connection.in_transaction:
+                yield self
+                return
+            self._connection.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+            try:
+                yield self
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
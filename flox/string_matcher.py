@@ -1,5 +1,6 @@
-from dataclasses import dataclass, field
-from typing import List
+import os
+from heapq import heappush, heapreplace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 SPACE_CHAR: str = ' '
 QUERY_SEARCH_PRECISION = {
@@ -8,6 +9,11 @@ QUERY_SEARCH_PRECISION = {
     'None': 0
 }
 DEFAULT_QUERY_SEARCH_PRECISION = QUERY_SEARCH_PRECISION['Regular']
+# CandidateIndex switches to the NumPy backend, when installed, from this many candidates
+NUMPY_MIN_CORPUS_SIZE = 5000
+# and to a process pool from this many, when more than one worker is allowed, unless
+# CandidateIndex is given its own parallel_min_size
+PARALLEL_MIN_CORPUS_SIZE = 250000
 
 """
 This is a python copy of Flow Launcher's string matcher.
@@ -15,13 +21,23 @@ I take no credit for the algorithm, I just translated it to python.
 """
 
 
-@dataclass
 class MatchData:
     """Match data"""
-    matched: bool
-    score_cutoff: int
-    index_list: List[int] = field(default_factory=list)
-    score: int = 0
+    __slots__ = ('matched', 'score_cutoff', 'index_list', 'score')
+
+    def __init__(self, matched: bool, score_cutoff: int, index_list: List[int] = None, score: int = 0):
+        self.matched = matched
+        self.score_cutoff = score_cutoff
+        self.index_list = index_list if index_list is not None else []
+        self.score = score
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(matched={self.matched!r}, score_cutoff={self.score_cutoff!r}, index_list={self.index_list!r}, score={self.score!r})'
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.matched, self.score_cutoff, self.index_list, self.score) == (other.matched, other.score_cutoff, other.index_list, other.score)
 
 
 def string_matcher(query: str, text: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> MatchData:
@@ -217,3 +233,452 @@ def calculate_closest_space_index(space_indices: List[int], first_match_index: i
             break
 
     return closest_space_index
+
+
+class Candidate:
+    """Candidate text with its lowered form and acronym tables precomputed"""
+    __slots__ = ('text', 'lower', '_acronym', '_acronym_count', '_acronym_count_lower', '_acronym_stats')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self._acronym = None
+        self._acronym_count = None
+        self._acronym_count_lower = None
+        self._acronym_stats = None
+
+    @classmethod
+    def from_tables(cls, text: str, lower: str, acronym: Sequence, acronym_count: Sequence, acronym_count_lower: Sequence, acronym_stats: Tuple[int, bool]) -> 'Candidate':
+        """Build a candidate from tables computed earlier, any sequences of truthy flags will do"""
+        candidate = cls.__new__(cls)
+        candidate.text = text
+        candidate.lower = lower
+        candidate._acronym = acronym
+        candidate._acronym_count = acronym_count
+        candidate._acronym_count_lower = acronym_count_lower
+        candidate._acronym_stats = acronym_stats
+        return candidate
+
+    def acronym_stats(self) -> Tuple[int, bool]:
+        """Return (upper limit of acronym positions, whether the text contains digits)"""
+        if self._acronym_stats is None:
+            text = self.text
+            digits = sum(map(str.isdigit, text))
+            self._acronym_stats = (1 + text.count(SPACE_CHAR) + sum(map(str.isupper, text)) + digits, digits > 0)
+        return self._acronym_stats
+
+    def tables(self, ignore_case: bool = True) -> Tuple[Sequence, Sequence, Sequence]:
+        """Return (acronym, acronym_count, acronym_count_full) flags per character"""
+        if self._acronym is None:
+            text = self.text
+            self._acronym = [is_acronym(text, i) for i in range(len(text))]
+            self._acronym_count = [is_acronym_count(text, i) for i in range(len(text))]
+        if not ignore_case:
+            return self._acronym, self._acronym_count, self._acronym_count
+        if self._acronym_count_lower is None:
+            lower = self.lower
+            self._acronym_count_lower = [is_acronym_count(lower, i) for i in range(len(lower))]
+        return self._acronym, self._acronym_count, self._acronym_count_lower
+
+
+class CompiledQuery:
+    """Query preprocessed once so it can be matched against many candidates"""
+    __slots__ = ('query', 'query_lower', 'substrings', 'chars', 'ignore_case', 'query_search_precision', 'prefilter')
+
+    def __init__(self, query: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION):
+        self.query = query.strip() if query else ''
+        self.query_lower = self.query.lower() if ignore_case else self.query
+        self.substrings = self.query_lower.split(SPACE_CHAR)
+        self.chars = self.query_lower.replace(SPACE_CHAR, '')
+        self.ignore_case = ignore_case
+        self.query_search_precision = query_search_precision
+        # Every successful match contains the query characters in order, which
+        # lets us reject candidates with str.find before walking them. Queries
+        # with empty substrings or a case-folded length change are left alone.
+        self.prefilter = '' not in self.substrings and len(self.query_lower) == len(self.query)
+
+    def contained_in(self, full_text: str) -> bool:
+        """Check that the query characters appear in order in full_text"""
+        pos = 0
+        for char in self.chars:
+            pos = full_text.find(char, pos) + 1
+            if not pos:
+                return False
+        return True
+
+    def max_score(self, candidate: Candidate) -> float:
+        """Upper bound of the score match() can return for candidate"""
+        query = self.query
+        text = candidate.text
+        if not text or not query:
+            return 0
+        count = len(self.chars)
+        # first_index >= 0 and match_length >= count in calculate_search_score
+        score = 100 * (len(query) + 1) / (count + 2)
+        if (len(text) - len(query)) < 5:
+            score += 20
+        elif (len(text) - len(query)) < 10:
+            score += 10
+        threshold: int = 4
+        if count <= threshold:
+            score += count * 10
+        else:
+            score += threshold * 10 + (count - threshold) * 5
+
+        acronym_limit, has_digits = candidate.acronym_stats()
+        if acronym_limit >= len(query):
+            # Without digits every matched acronym is also counted, capping the score at 100
+            score = max(score, 100 if not has_digits else 100 * len(query))
+        return score
+
+    def match(self, candidate: Candidate) -> MatchData:
+        """Compare query to a precompiled candidate, same result as string_matcher"""
+        matched, score, index_list = self._walk(candidate, True)
+        if not matched:
+            return MatchData(False, self.query_search_precision)
+        return MatchData(True, self.query_search_precision, index_list, score)
+
+    def score(self, candidate: Candidate) -> Optional[float]:
+        """Score of match(candidate) without building highlight indices, None if it doesn't match"""
+        matched, score, _ = self._walk(candidate, False)
+        return score if matched else None
+
+    def _walk(self, candidate: Candidate, highlight: bool) -> Tuple[bool, float, Optional[List[int]]]:
+        query_search_precision = self.query_search_precision
+        text = candidate.text
+        if not text or not self.query:
+            return False, 0, None
+
+        full_text_lower = candidate.lower if self.ignore_case else text
+        if len(full_text_lower) != len(text):
+            # Lowercasing changed the length, only the reference walk reproduces this.
+            # It can index past the end of text, which is treated as no match.
+            try:
+                match = string_matcher(self.query, text, self.ignore_case, query_search_precision)
+            except IndexError:
+                return False, 0, None
+            return match.matched, match.score, match.index_list
+        if self.prefilter and not self.contained_in(full_text_lower):
+            return False, 0, None
+
+        query = self.query
+        query_lower = self.query_lower
+        query_length = len(query_lower)
+        query_substrings = self.substrings
+        acronym, acronym_count, acronym_count_full = candidate.tables(self.ignore_case)
+
+        current_acronym_query_index = 0
+        acronym_match_data: List[int] = []
+        acronyms_total_count: int = 0
+        acronyms_matched: int = 0
+
+        current_query_substring_index: int = 0
+        current_query_substring = query_substrings[0]
+        current_query_substring_char_index = 0
+
+        first_match_index = -1
+        first_match_index_in_word = -1
+        last_match_index = 0
+        all_query_substrings_matched: bool = False
+        match_found_in_previous_loop: bool = False
+        all_substrings_contained_in_text: bool = True
+
+        index_list: List[int] = []
+        space_indices: List[int] = []
+        for text_index, char in enumerate(full_text_lower):
+            if current_acronym_query_index >= query_length:
+                if acronyms_matched == query_length and acronym_count_full[text_index]:
+                    acronyms_total_count += 1
+                    continue
+                break
+
+            if char == SPACE_CHAR and current_query_substring_char_index == 0:
+                space_indices.append(text_index)
+
+            if acronym[text_index] and char == query_lower[current_acronym_query_index]:
+                if highlight:
+                    acronym_match_data.append(text_index)
+                acronyms_matched += 1
+                current_acronym_query_index += 1
+
+            if acronym_count[text_index]:
+                acronyms_total_count += 1
+
+            if all_query_substrings_matched or char != current_query_substring[current_query_substring_char_index]:
+                match_found_in_previous_loop = False
+                continue
+
+            if first_match_index < 0:
+                first_match_index = text_index
+
+            if current_query_substring_char_index == 0:
+                match_found_in_previous_loop = True
+                first_match_index_in_word = text_index
+            elif not match_found_in_previous_loop:
+                start_index_to_verify = text_index - current_query_substring_char_index
+
+                if full_text_lower[start_index_to_verify:text_index] == current_query_substring[:current_query_substring_char_index]:
+                    match_found_in_previous_loop = True
+                    first_match_index_in_word = start_index_to_verify if current_query_substring_index == 0 else first_match_index
+
+                    if highlight:
+                        index_list = get_updated_index_list(
+                            start_index_to_verify, current_query_substring_char_index, first_match_index_in_word, index_list)
+
+            last_match_index = text_index + 1
+            if highlight:
+                index_list.append(text_index)
+
+            current_query_substring_char_index += 1
+
+            if current_query_substring_char_index == len(current_query_substring):
+                all_substrings_contained_in_text = match_found_in_previous_loop and all_substrings_contained_in_text
+
+                current_query_substring_index += 1
+
+                all_query_substrings_matched = current_query_substring_index >= len(query_substrings)
+
+                if all_query_substrings_matched:
+                    continue
+
+                current_query_substring = query_substrings[current_query_substring_index]
+                current_query_substring_char_index = 0
+
+        if acronyms_matched > 0 and acronyms_matched == len(query):
+            acronyms_score: int = acronyms_matched * 100 / acronyms_total_count
+
+            if acronyms_score >= query_search_precision:
+                return True, acronyms_score, acronym_match_data
+
+        if all_query_substrings_matched:
+
+            nearest_space_index = calculate_closest_space_index(
+                space_indices, first_match_index)
+
+            score = calculate_search_score(query, text, first_match_index - nearest_space_index - 1,
+                                           space_indices, last_match_index - first_match_index, all_substrings_contained_in_text)
+
+            return True, score, index_list
+
+        return False, 0, None
+
+
+def compile_query(query: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> CompiledQuery:
+    """Preprocess query for repeated matching"""
+    return CompiledQuery(query, ignore_case, query_search_precision)
+
+
+class CandidateIndex:
+    """
+    Ordered list of candidates whose precompiled texts are reused between queries.
+
+    Searches of parallel_min_size candidates or more (PARALLEL_MIN_CORPUS_SIZE
+    by default) run on a pool of worker processes, one per CPU when workers
+    is None. With workers=1, or a single CPU, they stay in this process.
+    """
+
+    def __init__(self, items: Iterable = (), key: Callable[[Any], str] = None, workers: int = None, parallel_min_size: int = None):
+        self.key = key
+        self.workers = workers
+        self.parallel_min_size = parallel_min_size
+        self.items: List[Any] = []
+        self.candidates: List[Candidate] = []
+        # Bumped whenever existing positions stop holding the same candidates
+        self.version = 0
+        self._cache: Dict[str, Candidate] = {}
+        self._numpy_corpus = None
+        self._shared_corpus = None
+        # Set when candidates were added since the backends were built, they are rebuilt on the next search
+        self._stale = False
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def candidate(self, text: str) -> Candidate:
+        """Return the cached Candidate for text, compiling it on first use"""
+        candidate = self._cache.get(text)
+        if candidate is None:
+            candidate = self._cache[text] = Candidate(text)
+        return candidate
+
+    def append(self, item) -> None:
+        self._stale = True
+        self.items.append(item)
+        self.candidates.append(self.candidate((self.key(item) if self.key else item) or ''))
+
+    def extend(self, items: Iterable) -> None:
+        for item in items:
+            self.append(item)
+
+    def clear(self) -> None:
+        self._reset_backends()
+        self.version += 1
+        self.items.clear()
+        self.candidates.clear()
+        self._cache.clear()
+
+    def match(self, query: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> List[MatchData]:
+        """Match query against every candidate, in order"""
+        compiled = compile_query(query, ignore_case, query_search_precision)
+        return [compiled.match(candidate) for candidate in self.candidates]
+
+    def search(self, query: str, k: int = 50, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> List[Tuple[Any, MatchData]]:
+        """Return the k best matches as (item, MatchData), best first"""
+        compiled = compile_query(query, ignore_case, query_search_precision)
+        parallel_min_size = PARALLEL_MIN_CORPUS_SIZE if self.parallel_min_size is None else self.parallel_min_size
+        if (self.workers or os.cpu_count() or 1) > 1 and len(self) >= parallel_min_size:
+            ranked = self.shared_corpus().search(query, k, ignore_case, query_search_precision)
+        elif compiled.prefilter and len(self) >= NUMPY_MIN_CORPUS_SIZE and self.numpy_corpus() is not None:
+            ranked = self.numpy_corpus().search(compiled, k)
+        else:
+            return _select(compiled, zip(self.items, self.candidates), k)
+        return [(self.items[position], compiled.match(self.candidates[position])) for position, _ in ranked]
+
+    def numpy_corpus(self):
+        """Return the encoded corpus used by the NumPy backend, None if NumPy isn't installed"""
+        self._refresh_backends()
+        if self._numpy_corpus is None:
+            try:
+                from .string_matcher_numpy import NumpyCorpus
+            except ImportError:
+                return None
+            self._numpy_corpus = NumpyCorpus(self.candidates)
+        return self._numpy_corpus
+
+    def shared_corpus(self):
+        """Return the shared memory corpus searched by worker processes"""
+        self._refresh_backends()
+        if self._shared_corpus is None:
+            from .parallel_matcher import SharedCorpus
+            self._shared_corpus = SharedCorpus([candidate.text for candidate in self.candidates], self.workers)
+        return self._shared_corpus
+
+    def close(self) -> None:
+        """Stop worker processes started by search"""
+        self._reset_backends()
+
+    def _refresh_backends(self) -> None:
+        if self._stale:
+            self._reset_backends()
+
+    def _reset_backends(self) -> None:
+        self._stale = False
+        self._numpy_corpus = None
+        if self._shared_corpus is not None:
+            self._shared_corpus.close()
+            self._shared_corpus = None
+
+
+def search(query: str, candidates: Iterable, k: int = 50, key: Callable[[Any], str] = None, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> List[Tuple[Any, MatchData]]:
+    """
+    Return the k best matches for query as (item, MatchData), best first.
+
+    Only matches scoring at least query_search_precision are kept. A bounded
+    heap holds the current top k and candidates whose best possible score
+    can't beat the k-th score are skipped without being walked. Ties keep
+    the order of candidates. Pass k=None to keep every match.
+    """
+    if isinstance(candidates, CandidateIndex):
+        return candidates.search(query, k, ignore_case, query_search_precision)
+    compiled = compile_query(query, ignore_case, query_search_precision)
+    pairs = ((item, Candidate((key(item) if key else item) or '')) for item in candidates)
+    return _select(compiled, pairs, k)
+
+
+def _select(compiled: CompiledQuery, pairs: Iterable[Tuple[Any, Candidate]], k: Optional[int]) -> List[Tuple[Any, MatchData]]:
+    query_search_precision = compiled.query_search_precision
+    if k is not None and k <= 0:
+        return []
+
+    heap: List[Tuple[float, int, Any, Candidate]] = []
+    for order, (item, candidate) in enumerate(pairs):
+        full = k is not None and len(heap) >= k
+        max_score = compiled.max_score(candidate)
+        if max_score < query_search_precision or (full and max_score <= heap[0][0]):
+            continue
+        score = compiled.score(candidate)
+        if score is None or score < query_search_precision:
+            continue
+        # Ties are broken on -order so the latest candidate is evicted first
+        entry = (score, -order, item, candidate)
+        if not full:
+            heappush(heap, entry)
+        elif score > heap[0][0]:
+            heapreplace(heap, entry)
+
+    heap.sort(reverse=True)
+    # Highlight indices are only built for the results that are returned
+    return [(item, compiled.match(candidate)) for _, _, item, candidate in heap]
+
+
+class MatcherSession:
+    """
+    Search a candidate list one keystroke at a time.
+
+    The session remembers which candidates contain the previous query's
+    characters in order. When the next query extends the previous one only
+    those survivors are scanned again, anything else (backspace, edits,
+    a changed index) falls back to a full scan. Results are the same as
+    search().
+    """
+
+    def __init__(self, candidates: Iterable, key: Callable[[Any], str] = None, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION):
+        self.index = candidates if isinstance(candidates, CandidateIndex) else CandidateIndex(candidates, key)
+        self.ignore_case = ignore_case
+        self.query_search_precision = query_search_precision
+        self._chars: Optional[str] = None
+        self._survivors: List[int] = []
+        self._size = 0
+        self._version = self.index.version
+
+    def reset(self) -> None:
+        """Forget the previous query, the next search scans every candidate"""
+        self._chars = None
+        self._survivors = []
+        self._size = 0
+
+    def _narrow(self, compiled: CompiledQuery) -> List[int]:
+        size = len(self.index)
+        version = self.index.version
+        if self._chars is not None and version == self._version and size >= self._size and compiled.chars.startswith(self._chars):
+            positions = self._survivors + list(range(self._size, size))
+        else:
+            positions = range(size)
+
+        if not compiled.prefilter:
+            self.reset()
+            return list(positions)
+
+        candidates = self.index.candidates
+        ignore_case = self.ignore_case
+        survivors = []
+        for position in positions:
+            candidate = candidates[position]
+            full_text = candidate.lower if ignore_case else candidate.text
+            # Case folding that changes the length skips the prefilter in match(), keep those
+            if len(full_text) != len(candidate.text) or compiled.contained_in(full_text):
+                survivors.append(position)
+        self._chars = compiled.chars
+        self._survivors = survivors
+        self._size = size
+        self._version = version
+        return survivors
+
+    def search(self, query: str, k: int = 50) -> List[Tuple[Any, MatchData]]:
+        """Return the k best matches as (item, MatchData), best first"""
+        compiled = compile_query(query, self.ignore_case, self.query_search_precision)
+        items = self.index.items
+        candidates = self.index.candidates
+        return _select(compiled, ((items[i], candidates[i]) for i in self._narrow(compiled)), k)
+
+
+def match_score(query: str, text: str, ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> Optional[float]:
+    """Score string_matcher would give text, None if it doesn't match"""
+    return compile_query(query, ignore_case, query_search_precision).score(Candidate(text or ''))
+
+
+def match_all(query: str, texts: Iterable[str], ignore_case: bool = True, query_search_precision: int = DEFAULT_QUERY_SEARCH_PRECISION) -> List[MatchData]:
+    """Batch version of string_matcher, the query is only preprocessed once"""
+    compiled = compile_query(query, ignore_case, query_search_precision)
+    return [compiled.match(Candidate(text)) for text in texts]
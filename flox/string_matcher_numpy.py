@@ -0,0 +1,129 @@
+from heapq import heappush, heapreplace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .string_matcher import Candidate, CompiledQuery
+
+"""
+NumPy backend for flox.string_matcher.
+
+The corpus is encoded once into a flat code point array with per candidate
+offsets. Candidate filtering and the calculate_search_score upper bound are
+computed in bulk, the exact score is only walked for candidates that can
+still reach the top k. Results are the same as string_matcher.search.
+"""
+
+# Absorbs float rounding differences between the bulk and per candidate bounds
+BOUND_TOLERANCE = 1e-9
+
+
+class NumpyCorpus:
+    """Candidate list encoded for bulk filtering"""
+
+    def __init__(self, candidates: List[Candidate]):
+        self.candidates = candidates
+        count = len(candidates)
+        self.lengths = np.fromiter((len(candidate.text) for candidate in candidates), dtype=np.int64, count=count)
+        self.ends = np.cumsum(self.lengths)
+        self.starts = self.ends - self.lengths
+        stats = [candidate.acronym_stats() for candidate in candidates]
+        self.acronym_limit = np.fromiter((limit for limit, _ in stats), dtype=np.int64, count=count)
+        self.has_digits = np.fromiter((digits for _, digits in stats), dtype=bool, count=count)
+        self._codes: Dict[bool, Tuple[np.ndarray, np.ndarray]] = {}
+        self._occurrences: Dict[Tuple[bool, str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def codes(self, ignore_case: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the flat code point array and the mask of candidates changed in length by lowercasing"""
+        if ignore_case not in self._codes:
+            texts = []
+            folded = np.zeros(len(self.candidates), dtype=bool)
+            for i, candidate in enumerate(self.candidates):
+                text = candidate.lower if ignore_case else candidate.text
+                if len(text) != len(candidate.text):
+                    # match() skips the prefilter for these, keep offsets aligned with the original text
+                    folded[i] = True
+                    text = candidate.text
+                texts.append(text)
+            flat = np.frombuffer(''.join(texts).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+            self._codes[ignore_case] = (flat, folded)
+        return self._codes[ignore_case]
+
+    def occurrences(self, char: str, ignore_case: bool) -> np.ndarray:
+        """Sorted flat positions of char"""
+        key = (ignore_case, char)
+        if key not in self._occurrences:
+            flat, _ = self.codes(ignore_case)
+            self._occurrences[key] = np.flatnonzero(flat == ord(char))
+        return self._occurrences[key]
+
+    def max_scores(self, compiled: CompiledQuery) -> np.ndarray:
+        """Bulk version of CompiledQuery.max_score"""
+        query_length = len(compiled.query)
+        count = len(compiled.chars)
+        diff = self.lengths - query_length
+        score = 100 * (query_length + 1) / (count + 2) + np.where(diff < 5, 20, np.where(diff < 10, 10, 0))
+        threshold: int = 4
+        if count <= threshold:
+            score += count * 10
+        else:
+            score += threshold * 10 + (count - threshold) * 5
+        acronym_score = np.where(self.has_digits, 100 * query_length, 100)
+        score = np.where(self.acronym_limit >= query_length, np.maximum(score, acronym_score), score)
+        score[self.lengths == 0] = 0
+        return score
+
+    def contained(self, compiled: CompiledQuery, rows: np.ndarray) -> np.ndarray:
+        """Rows whose text contains the query characters in order"""
+        _, folded = self.codes(compiled.ignore_case)
+        kept = rows[folded[rows]]
+        rows = rows[~folded[rows]]
+        starts = self.starts[rows]
+        ends = self.ends[rows]
+        position = starts.copy()
+        for char in compiled.chars:
+            if not len(rows):
+                break
+            occurrences = self.occurrences(char, compiled.ignore_case)
+            if not len(occurrences):
+                rows = rows[:0]
+                break
+            found = np.searchsorted(occurrences, position)
+            alive = found < len(occurrences)
+            following = np.where(alive, occurrences[np.minimum(found, len(occurrences) - 1)], 0)
+            alive &= following < ends
+            rows, starts, ends, position = rows[alive], starts[alive], ends[alive], following[alive] + 1
+        return np.sort(np.concatenate((rows, kept)))
+
+    def search(self, compiled: CompiledQuery, k: Optional[int]) -> List[Tuple[int, float]]:
+        """Return the positions and scores of the k best matches, best first"""
+        if (k is not None and k <= 0) or not compiled.query or not len(self.candidates):
+            return []
+        query_search_precision = compiled.query_search_precision
+        max_scores = self.max_scores(compiled)
+        rows = np.flatnonzero(max_scores + BOUND_TOLERANCE >= query_search_precision)
+        rows = self.contained(compiled, rows)
+        # Highest bound first, so the scan can stop once the bound drops below the k-th score
+        rows = rows[np.argsort(-max_scores[rows], kind='stable')]
+
+        candidates = self.candidates
+        heap: List[Tuple[float, int]] = []
+        for position, max_score in zip(rows.tolist(), max_scores[rows].tolist()):
+            full = k is not None and len(heap) >= k
+            if full and max_score + BOUND_TOLERANCE < heap[0][0]:
+                break
+            score = compiled.score(candidates[position])
+            if score is None or score < query_search_precision:
+                continue
+            # Candidates arrive out of order, so ties are broken on position explicitly
+            entry = (score, -position)
+            if not full:
+                heappush(heap, entry)
+            elif entry > heap[0]:
+                heapreplace(heap, entry)
+
+        heap.sort(reverse=True)
+        return [(-position, score) for score, position in heap]
@@ -0,0 +1,44 @@
+"""
+Executor for work that may still be running when a request's results are returned.
+
+concurrent.futures.ThreadPoolExecutor threads, asyncio's default executor
+included, are joined when the interpreter exits, so a slow call would keep
+a plugin started for a single request alive long after it answered. The
+launcher reads until the plugin exits, which makes request_timeout useless.
+"""
+import threading
+from concurrent.futures import Executor, Future
+
+
+class DaemonExecutor(Executor):
+    """
+    Runs every call on its own daemon thread, calls still running when the
+    plugin process exits are abandoned
+    """
+
+    def __init__(self, thread_name_prefix: str = 'flox'):
+        self.thread_name_prefix = thread_name_prefix
+        self._count = 0
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        self._count += 1
+        threading.Thread(target=run, name=f'{self.thread_name_prefix}-{self._count}', daemon=True).start()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._shutdown = True
@@ -1,13 +1,9 @@
-from tempfile import gettempdir
-from urllib import request
-from urllib.error import URLError
 from pathlib import Path
 from functools import wraps
 import json
 import os
 from time import time
 import socket
-from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logging = logging.getLogger(__name__)
@@ -16,16 +12,24 @@ URL_SCHEMA = [
     'http://',
     'https://',
 ]
-socket.setdefaulttimeout(15)
+SOCKET_TIMEOUT = 15
+socket.setdefaulttimeout(SOCKET_TIMEOUT)
 
-def cache(file_name:str, max_age=30, dir=gettempdir()):
+def gettempdir():
+    """
+    tempfile.gettempdir, imported on first use
+    """
+    from tempfile import gettempdir
+    return gettempdir()
+
+def cache(file_name:str, max_age=30, dir=None):
     """
     Cache decorator
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            cache_file = Path(dir, file_name)
+            cache_file = Path(dir or gettempdir(), file_name)
             if not Path(cache_file).is_absolute():
                 cache_file = Path(gettempdir(), cache_file)
             if cache_file.exists() and file_age(cache_file) < max_age and cache_file.stat().st_size != 0:
@@ -72,25 +76,25 @@ def get_cache(path, max_age=0):
         return read_json(path)
     return None
 
-def refresh_cache(file_name:str, dir:str=gettempdir()):
+def refresh_cache(file_name:str, dir:str=None):
     """
     Touch cache file
     """
-    cache_file = Path(dir, file_name)
+    cache_file = Path(dir or gettempdir(), file_name)
     if cache_file.exists():
         cache_file.touch()
 
-def cache_path(file_name:str, dir:str=gettempdir()):
+def cache_path(file_name:str, dir:str=None):
     """
     Return path to cache file
     """
-    return Path(dir, file_name)
+    return Path(dir or gettempdir(), file_name)
 
-def remove_cache(file_name:str, dir:str=gettempdir()):
+def remove_cache(file_name:str, dir:str=None):
     """
     Remove cache file
     """
-    cache_file = Path(dir, file_name)
+    cache_file = Path(dir or gettempdir(), file_name)
     if cache_file.exists():
         cache_file.unlink()
 
@@ -109,6 +113,8 @@ def download_file(url:str, path, **kwargs):
     force_download = kwargs.pop('force_download', False)
     if not force_download and path.exists():
         return
+    from urllib import request
+    from urllib.error import URLError
     try:
         request.urlretrieve(url, path)
     except URLError as e:
@@ -26,6 +26,10 @@ setup(name='Flox-lib',
       author_email='dev.garulf@gmail.com',
       license='MIT',
       packages=['flox'],
+      extras_require={
+            'numpy': ['numpy'],
+            'orjson': ['orjson']
+      },
       zip_safe=True,
       include_package_data=True,
       package_data = {